@@ -6,7 +6,16 @@
 #   https://he-m-wikipedia-org.translate.goog/wiki/ספרת_ביקורת?_x_tr_sl=auto&_x_tr_tl=en
 #
 
-val = 3201579484
+import argparse
+import csv
+import itertools
+import sys
+
+import numpy as np
+
+# Contribution of a digit to the Luhn sum for the weights 1 and 2.
+LUHN = np.array([[0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+                 [0, 2, 4, 6, 8, 1, 3, 5, 7, 9]], dtype=np.int64)
 
 def check_digit(val):
     val = str(val)
@@ -26,5 +35,84 @@ def check_digit(val):
 def validate(val):
     return check_digit(val) == val % 10
 
-print(check_digit(val))
-print(validate(val))
+def _ids(ids):
+    """Return the IDs as an int64 array, reading them from a file if needed."""
+    if isinstance(ids, str):
+        return np.loadtxt(ids, dtype=np.int64, ndmin=1)
+    return np.asarray(ids, dtype=np.int64)
+
+def check_digits(ids):
+    """Return the check digits of an array (or a file) of 9-digit IDs.
+
+    IDs with fewer digits are taken to be padded with leading zeros.
+    """
+    body = _ids(ids) // 10
+    total = np.zeros(body.shape, dtype=np.int64)
+    for i in range(8):
+        digit = body // 10**(7 - i) % 10
+        total += LUHN[i % 2][digit]
+
+    return (10 - total % 10) % 10
+
+def validate_many(ids):
+    """Return a boolean mask of the valid IDs in an array (or a file)."""
+    ids = _ids(ids)
+    return (ids >= 0) & (ids < 10**9) & (check_digits(ids) == ids % 10)
+
+def _parse(fields):
+    """Convert ID strings to int64, with -1 for anything that is not an ID."""
+    fields = np.char.strip(np.asarray(fields, dtype=str))
+
+    # Only ASCII digits (isdigit() also accepts, e.g., superscripts).
+    length = np.char.str_len(fields)
+    ok = (length > 0) & (length <= 9) & (np.char.strip(fields, "0123456789") == "")
+    return np.where(ok, fields, "-1").astype(np.int64)
+
+def validate_stream(infile, outfile, column=None, delimiter=",", header=False, chunk=2**20):
+    """Validate the IDs in a file chunk by chunk and write the invalid rows.
+
+    The IDs are read from the given column of a delimited file (or from
+    whole lines if column is None), chunk lines at a time, so that memory
+    use does not grow with the size of the file.  Returns the number of
+    rows and of invalid rows.
+    """
+    if header:
+        outfile.write(next(infile, ""))
+
+    total, invalid = 0, 0
+    while True:
+        lines = list(itertools.islice(infile, chunk))
+        if not lines:
+            break
+
+        if column is None:
+            fields = lines
+        else:
+            # Each line is taken to be one record (no quoted newlines).
+            rows = csv.reader(lines, delimiter=delimiter)
+            fields = [row[column] if column < len(row) else "" for row in rows]
+
+        bad = ~validate_many(_parse(fields))
+        outfile.writelines(itertools.compress(lines, bad))
+        total, invalid = total + len(lines), invalid + int(bad.sum())
+
+    return total, invalid
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write the rows of a file with invalid Israeli IDs.")
+    parser.add_argument("infile", nargs="?", default="-",
+                        help="file with one ID per line, or a delimited file (default: stdin)")
+    parser.add_argument("-o", "--output", default="-", help="file for the invalid rows (default: stdout)")
+    parser.add_argument("-c", "--column", type=int, help="(0-based) column of the IDs in a delimited file")
+    parser.add_argument("-d", "--delimiter", default=",", help="column delimiter (default: ,)")
+    parser.add_argument("--header", action="store_true", help="copy the first line to the output as is")
+    parser.add_argument("--chunk", type=int, default=2**20, help="number of lines validated at a time")
+    args = parser.parse_args()
+
+    infile = sys.stdin if args.infile == "-" else open(args.infile, newline="")
+    outfile = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    with infile, outfile:
+        total, invalid = validate_stream(infile, outfile, args.column, args.delimiter,
+                                         args.header, args.chunk)
+
+    print("{} rows, {} valid, {} invalid".format(total, total - invalid, invalid), file=sys.stderr)
@@ -1,20 +1,183 @@
-"""N-queens problem."""
+"""N-queens problem.
 
-from itertools import permutations
+Queens are placed row by row using bitmask backtracking: the columns and
+the two diagonals that are under attack are kept as bits of integers, so
+that the free squares of a row are found with a few bitwise operations.
+Since the mirror image of a solution is also a solution, only the left
+half of the first row is searched (and for odd n, with the first queen in
+the middle column, only the left half of the second row).
 
-n = 8
+For counting, the search can be split into independent subproblems, one
+for every placement of queens in the first few rows, which are handed
+out one at a time to a pool of worker processes.
+"""
 
-def clear(cols):
-    for i in range(n):
-        for j in range(i + 1, n):
-            if abs(cols[j] - cols[i]) == (j - i):
-                return False
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-    return True
 
-numsol = 0
-for cols in permutations(range(n)):
-    if clear(cols):
-        numsol +=1
+def _count(full, cols, ld, rd):
+    """Count the completions of a board with the given attacked squares."""
+    if cols == full:
+        return 1
 
-print(numsol)
+    total = 0
+    avail = full & ~(cols | ld | rd)
+    while avail:
+        bit = avail & -avail
+        avail ^= bit
+        total += _count(full, cols | bit, ((ld | bit) << 1) & full, (rd | bit) >> 1)
+
+    return total
+
+
+def _solve(full, cols, ld, rd, placed):
+    """Yield the completions of a board as lists of column bits."""
+    if cols == full:
+        yield placed
+        return
+
+    avail = full & ~(cols | ld | rd)
+    while avail:
+        bit = avail & -avail
+        avail ^= bit
+        yield from _solve(full, cols | bit, ((ld | bit) << 1) & full, (rd | bit) >> 1,
+                          placed + [bit])
+
+
+def _starts(n):
+    """Return the first one or two rows of the symmetry-reduced search.
+
+    Every board in the list stands for itself and its mirror image.
+    """
+    full = (1 << n) - 1
+    starts = [[1 << c] for c in range(n // 2)]
+
+    if n % 2:
+        mid = 1 << (n // 2)
+        avail = full & ~(mid | (mid << 1) | (mid >> 1)) & (mid - 1)
+        starts += [[mid, 1 << c] for c in range(n // 2) if avail & (1 << c)]
+
+    return starts
+
+
+def _board(full, placed):
+    """Return the attacked (cols, ld, rd) after placing queens row by row."""
+    cols, ld, rd = 0, 0, 0
+    for bit in placed:
+        cols, ld, rd = cols | bit, ((ld | bit) << 1) & full, (rd | bit) >> 1
+
+    return cols, ld, rd
+
+
+def _split(n, depth):
+    """Return the placements of queens in the first depth rows.
+
+    Only the placements extending the symmetry-reduced first rows are
+    returned, so that each stands for itself and its mirror image.
+    """
+    full = (1 << n) - 1
+    tasks = _starts(n)
+    for _ in range(depth - 1):
+        deeper = []
+        for placed in tasks:
+            # Complete boards (when depth > n) are kept as they are.
+            cols, ld, rd = _board(full, placed)
+            if len(placed) >= depth or cols == full:
+                deeper.append(placed)
+                continue
+            avail = full & ~(cols | ld | rd)
+            while avail:
+                bit = avail & -avail
+                avail ^= bit
+                deeper.append(placed + [bit])
+        tasks = deeper
+
+    return tasks
+
+
+def _count_worker(n, placed):
+    """Count the completions of a placement; returns (count, pid, seconds)."""
+    start = time.perf_counter()
+    full = (1 << n) - 1
+    total = _count(full, *_board(full, placed))
+    return total, os.getpid(), time.perf_counter() - start
+
+
+def count(n, workers=1, depth=3, stats=None):
+    """Return the number of solutions of the n-queens problem.
+
+    Parameters
+    ----------
+    n : int
+        size of the board
+    workers : int, optional
+        number of worker processes (None for all CPUs, 1 to count serially)
+    depth : int, optional
+        number of rows placed before handing subproblems to the workers
+    stats : dict, optional
+        if given, filled with the number of subproblems, the number of
+        solutions and the busy time in seconds of every worker (by pid)
+    """
+    if n == 1:
+        return 1
+
+    full = (1 << n) - 1
+    if workers == 1 and stats is None:
+        return sum(2 * _count(full, *_board(full, s)) for s in _starts(n))
+
+    tasks = _split(n, depth)
+    if workers == 1:
+        results = [_count_worker(n, t) for t in tasks]
+    else:
+        # Subproblems vary a lot in size, so they are dispatched one at a
+        # time to whichever worker is free.  The results come back in the
+        # order of the tasks, which keeps the sum deterministic.
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_count_worker, [n] * len(tasks), tasks))
+
+    if stats is not None:
+        for total, pid, seconds in results:
+            tasks_, solutions, busy = stats.get(pid, (0, 0, 0.))
+            stats[pid] = tasks_ + 1, solutions + 2 * total, busy + seconds
+
+    return sum(2 * total for total, _, _ in results)
+
+
+def solutions(n):
+    """Yield all solutions of the n-queens problem.
+
+    Each solution is a tuple giving the column of the queen in every row.
+    A solution is always followed by its mirror image.
+    """
+    if n == 1:
+        yield (0,)
+        return
+
+    full = (1 << n) - 1
+    for s in _starts(n):
+        for placed in _solve(full, *_board(full, s), s):
+            cols = tuple(bit.bit_length() - 1 for bit in placed)
+            yield cols
+            yield tuple(n - 1 - c for c in cols)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    if workers == 1:
+        print(count(n))
+    else:
+        stats = dict()
+        start = time.perf_counter()
+        print(count(n, workers=workers, stats=stats))
+        wall = time.perf_counter() - start
+
+        for pid, (tasks, found, busy) in sorted(stats.items()):
+            print("worker {}: {} tasks, {} solutions in {:.2f} s ({:.0f} solutions/s)".format(
+                pid, tasks, found, busy, found / busy if busy else 0), file=sys.stderr)
+        print("total: {:.2f} s wall, {:.2f} s busy".format(
+            wall, sum(s[2] for s in stats.values())), file=sys.stderr)
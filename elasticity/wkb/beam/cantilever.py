@@ -1,9 +1,16 @@
 """Cantilevered beam using WKB/finite elements."""
 
+import os
+import sys
+
 import matplotlib.pyplot as plt
 import numpy as np
-import scipy.linalg as linalg
-from scipy.integrate import quad
+
+# Shared beam assembly lives with the plain FEM scripts.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../fem/beam"))
+import beamcache  # noqa: E402
+import beamfem  # noqa: E402
+import wkb  # noqa: E402
 
 E = 1.  # elastic modulus
 I = 1.  # moment of area
@@ -15,42 +22,28 @@ nodes = N + 1  # number of nodes
 h = L / N  # length of beam element
 x = np.arange(0, h + L, h)
 
-# See 44m:44s of https://www.youtube.com/watch?v=RFH6i8ER284 for the
-# definition of the element stiffness/mass matrices.
-K_e = E * I / h**3 * np.array([[12, 6 * h, -12, 6 * h], [6 * h, 4 * h**2, -6 * h, 2 * h**2],
-                               [-12, -6 * h, 12, -6 * h], [6 * h, 2 * h**2, -6 * h, 4 * h**2]])
-M_e = mu * h / 420 * np.array([[156, 22 * h, 54, -13 * h], [22 * h, 4 * h**2, -13 * h, -3 * h**2],
-                               [54, 13 * h, 156, -22 * h], [-13 * h, -3 * h**2, -22 * h, 4 * h**2]])
-
-# The local stiffness matrix changes by this much.
+# The bending stiffness grows linearly along the beam.  The element
+# stiffness/mass matrices are integrated numerically; see 44m:44s of
+# https://www.youtube.com/watch?v=RFH6i8ER284 for the uniform case.
 eps = 3.0
-dK_e = E * I / h**3 * eps * np.array([[6, 2 * h, -6, 4 * h], [2 * h, h**2, -2 * h, h**2],
-                                      [-6, -2 * h, 6, -4 * h], [4 * h, h**2, -4 * h, 3 * h**2]])
-K_e += dK_e
-
-K = np.zeros((2 * (N+1), 2 * (N+1)))
-M = np.zeros((2 * (N+1), 2 * (N+1)))
+EI = lambda x: E * I * (1 + eps*x)
+K_e, M_e = beamfem.element_matrices(np.linspace(0, L, nodes), EI=EI, mu=mu)
 
-# Assemble global stiffness/mass matrix.
-for i in range(1, N + 1):
-    K[2 * (i-1):2 * (i-1) + 4][:, 2 * (i-1):2 * (i-1) + 4] += K_e
-    M[2 * (i-1):2 * (i-1) + 4][:, 2 * (i-1):2 * (i-1) + 4] += M_e
+def solve():
+    # Assemble global stiffness/mass matrix with cantilever BCs.
+    K = beamfem.assemble(K_e, N, bc="cantilever")
+    M = beamfem.assemble(M_e, N, bc="cantilever")
 
-# Cantilever BCs.
-K = np.delete(K, [0, 1], 0)
-K = np.delete(K, [0, 1], 1)
-M = np.delete(M, [0, 1], 0)
-M = np.delete(M, [0, 1], 1)
+    # Find the lowest eigenvalues and eigenvectors.
+    return beamfem.eigen(K, M, k=20)
 
-# Find eigenvalues and eigenvectors.
-freqs, modes = linalg.eig(K, M)
-i = np.argsort(freqs)
-# The freqs matrix has to be transposed before sorting.
-modes, freqs = modes.T[i].real, np.sqrt(freqs[i].real)
+# Reuse the solution from an earlier run if there is one.
+modes, freqs = beamcache.Cache().fetch(solve, E=E, I=I, mu=mu, L=L, N=N, bc="cantilever", k=20, eps=eps,
+                                      K_e=K_e, M_e=M_e)
 
 for i in range(5):
     # Cantilever.
-    u = np.hstack([0., modes[i][0:2*nodes - 2:2]])
+    u = beamfem.expand(modes[i], N, bc="cantilever")
     u = np.sign(u.mean()) * u
     plt.plot(x, u, label="$m = {}$".format(i + 1))
 
@@ -68,7 +61,7 @@ freq_unif = np.array([
 
 # WKB factor from numerical integration (Eq. 45 of Pierce's paper).
 f = lambda x: 1 / (1 + eps*x)**0.25
-factor = (quad(f, 0, L)[0])**2
+factor = wkb.integrate(f, 0, L)**2
 
 plt.figure()
 plt.title(r"Isotropic vs WKB vs FEM eigenvalues at $\epsilon = {}$".format(eps))
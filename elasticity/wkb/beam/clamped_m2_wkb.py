@@ -1,10 +1,17 @@
 """Clamped beam with varying curvature using WKB/FEM."""
 
+import os
+import sys
+
 import matplotlib.pyplot as plt
 import numpy as np
-import scipy.linalg as linalg
 from scipy.optimize import root
-from scipy.integrate import quad
+
+# Shared beam assembly lives with the plain FEM scripts.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../fem/beam"))
+import beamcache  # noqa: E402
+import beamfem  # noqa: E402
+import wkb  # noqa: E402
 
 E = 1.  # elastic modulus
 I = 1.  # moment of area
@@ -20,7 +27,7 @@ x = np.arange(-L / 2, L/2 + h, h)
 # definition of the element stiffness/mass matrices.
 K_e = E * I / h**3 * np.array([[12, 6 * h, -12, 6 * h], [6 * h, 4 * h**2, -6 * h, 2 * h**2],
                                [-12, -6 * h, 12, -6 * h], [6 * h, 2 * h**2, -6 * h, 4 * h**2]])
-A_e = h / 420 * np.array([[156, 22 * h, 54, -13 * h], [22 * h, 4 * h**2, -13 * h, -3 * h**2],
+A_e = h / 420 * np.array([[156, 22 * h, 54, -13 * h], [22 * h, 4 * h**2, 13 * h, -3 * h**2],
                           [54, 13 * h, 156, -22 * h], [-13 * h, -3 * h**2, -22 * h, 4 * h**2]])
 
 M_e = mu * A_e
@@ -28,31 +35,20 @@ M_e = mu * A_e
 # Middle point of each element.
 x_mid = 0.5 * (x[:-1] + x[1:])
 
-def eigen(m2):
+# The global matrices are assembled once; only the m2 * A_e part of the
+# stiffness matrix changes from one curvature profile to another.
+sweep = beamfem.Sweep(K_e, A_e, M_e, N, bc="clamped")
+cache = beamcache.Cache()
+
+def eigen(m2, k=25):
     """Find eigenmodes and frequencies."""
-    K = np.zeros((2 * (N+1), 2 * (N+1)))
-    M = np.zeros((2 * (N+1), 2 * (N+1)))
-
-    # Assemble global stiffness/mass matrix.
-    for i in range(1, N + 1):
-        K[2 * (i-1):2 * (i-1) + 4][:, 2 * (i-1):2 * (i-1) + 4] += K_e + m2[i - 1] * A_e
-        M[2 * (i-1):2 * (i-1) + 4][:, 2 * (i-1):2 * (i-1) + 4] += M_e
-
-    # Clamped-clamped BCs.
-    K = np.delete(K, [2*nodes - 2, 2*nodes - 1], 0)
-    K = np.delete(K, [2*nodes - 2, 2*nodes - 1], 1)
-    K = np.delete(K, [0, 1], 0)
-    K = np.delete(K, [0, 1], 1)
-    M = np.delete(M, [2*nodes - 2, 2*nodes - 1], 0)
-    M = np.delete(M, [2*nodes - 2, 2*nodes - 1], 1)
-    M = np.delete(M, [0, 1], 0)
-    M = np.delete(M, [0, 1], 1)
-
-    # Find eigenvalues and eigenvectors.
-    freqs, modes = linalg.eig(K, M)
-    i = np.argsort(freqs)
-    # The freqs matrix has to be transposed before sorting.
-    return modes.T[i].real, np.sqrt(freqs[i].real)
+    def solve():
+        modes, freqs = sweep.solve([m2], k=k)
+        return modes[0], freqs[0]
+
+    # Reuse the solution from an earlier run if there is one.
+    return cache.fetch(solve, E=E, I=I, mu=mu, L=L, N=N, bc="clamped", m2=np.asarray(m2, dtype=float), k=k,
+                       K_e=K_e, A_e=A_e, M_e=M_e)
 
 # Slowly varying "curvature".
 # Value of curvature at each element.
@@ -67,7 +63,7 @@ for i, s in zip((0, 8), ("C0-", "C3-")):
     plt.plot([tp, tp], [-0.1, 0.25], "C8--")
     plt.plot([-tp, -tp], [-0.1, 0.25], "C8--")
 
-    u = np.hstack([0., modes[i][0:2*nodes - 5:2], 0.])
+    u = beamfem.expand(modes[i], N, bc="clamped")
     u = np.sign(u.mean()) * u
     plt.plot(x, u, s, label="$n = {}$".format(i))
 
@@ -84,14 +80,9 @@ plt.title("Guess n vs. true n")
 n = np.arange(25)
 plt.plot(n, n, "C0-")
 
-def guess_n(w):
-    # Guess n from a given frequency by integrating the Bohr-Sommerfeld
-    # integral.
-    tp = np.arctanh(w / C) / eps  # classical turning points
-    I = lambda x: (w**2 - C**2 * np.tanh(eps * x)**2)**0.25
-    return quad(I, -tp, tp)[0] / np.pi + 0.5 - 1
-
-n_guess = [guess_n(f) for f in freqs[:25]]
+# Guess n from the FEM frequencies by evaluating the Bohr-Sommerfeld
+# integrals for all of them at once.
+n_guess = wkb.mode_number(freqs[:25], lambda x: C**2 * np.tanh(eps * x)**2, -L / 2, L / 2)
 plt.plot(n, n_guess, "C3o")
 plt.xlabel(r"True $n$")
 plt.ylabel(r"Guess $n$")
@@ -0,0 +1,128 @@
+"""Batched WKB (Bohr-Sommerfeld) quantization for beams.
+
+For a beam obeying u'''' + m2(x) u = w^2 u, the local wavenumber in the
+classically allowed region is k = (w^2 - m2(x))^(1/4), and the n-th mode
+(starting from n = 0) satisfies the Bohr-Sommerfeld condition
+
+    integral of k(x) dx between the turning points = pi (n + 1/2).
+
+All functions here work on whole arrays of frequencies at once.  The
+phase integrals are evaluated by fixed-order Gauss-Jacobi quadrature
+with the weight (1 - t^2)^(1/4), which absorbs the quarter-power
+behavior of the integrand at the turning points, so that the remaining
+integrand is smooth and the quadrature converges exponentially
+(Gauss-Chebyshev is the weight (1 - t^2)^(-1/2) of the same family).
+Where a turning point lies beyond an end of the beam, the integral is
+cut off at the end, where the integrand is smooth, and the weight has no
+factor for that end.
+"""
+
+import numpy as np
+from scipy.special import roots_jacobi
+
+
+def nodes(order=32, alpha=0., beta=None):
+    """Return the nodes and weights for integrating over [-1, 1].
+
+    The weights are those of Gauss-Jacobi quadrature with the weight
+    function (1 - t)^alpha (1 + t)^beta (beta = alpha by default), divided
+    by the weight function, so that they can be used directly on an
+    integrand that behaves like (1 - t)^alpha and (1 + t)^beta at the ends.
+    """
+    beta = alpha if beta is None else beta
+    t, w = roots_jacobi(order, alpha, beta)
+    return t, w / ((1 - t)**alpha * (1 + t)**beta)
+
+
+def integrate(f, a, b, order=32, alpha=0., beta=None):
+    """Integrate f from a to b for arrays of limits a and b.
+
+    The function f is called once with an array of shape (..., order) of
+    points, where ... is the broadcast shape of a and b.  The exponents
+    alpha (at b) and beta (at a) are those of nodes().
+    """
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    t, w = nodes(order, alpha, beta)
+    mid, half = 0.5 * (a+b), 0.5 * (b-a)
+
+    x = mid[..., None] + half[..., None] * t
+    return half * (f(x) @ w)
+
+
+def _bisect(f, inner, outer, iters=60):
+    """Find zeros of f between inner (f < 0) and outer (f > 0) by bisection.
+
+    Where f(outer) <= 0, i.e., there is no sign change, outer is returned.
+    """
+    inner, outer = np.broadcast_arrays(np.asarray(inner, dtype=float), np.asarray(outer, dtype=float))
+    inner, outer = inner.copy(), outer.copy()
+    found = f(outer) > 0
+
+    for _ in range(iters):
+        mid = 0.5 * (inner+outer)
+        pos = f(mid) > 0
+        outer = np.where(pos, mid, outer)
+        inner = np.where(pos, inner, mid)
+
+    return np.where(found, 0.5 * (inner+outer), outer)
+
+
+def _minimum(m2, lo, hi):
+    """Position of the bottom of the well m2 on [lo, hi]."""
+    x = np.linspace(lo, hi, 1025)
+    return x[np.argmin(m2(x))]
+
+
+def turning_points(w, m2, lo, hi, x0=None):
+    """Return the classical turning points (a, b) for frequencies w.
+
+    The potential m2 is assumed to have a single well with its bottom at
+    x0 (found numerically if not given).  Turning points beyond the ends
+    of the beam [lo, hi] are replaced by the ends.
+    """
+    w = np.asarray(w, dtype=float)
+    x0 = _minimum(m2, lo, hi) if x0 is None else x0
+    f = lambda x: m2(x) - w**2
+    return _bisect(f, x0, lo), _bisect(f, x0, hi)
+
+
+def phase(w, m2, lo, hi, x0=None, order=32):
+    """Return the Bohr-Sommerfeld phase integrals for frequencies w."""
+    w = np.asarray(w, dtype=float)
+    a, b = turning_points(w, m2, lo, hi, x0)
+    k = lambda x: np.maximum(w[..., None]**2 - m2(x), 0)**0.25
+
+    # The integrand only has the quarter-power behavior at ends that are
+    # turning points, not at ends of the beam.
+    result = np.zeros(np.broadcast(a, b).shape)
+    for beta in (0., 0.25):
+        for alpha in (0., 0.25):
+            use = ((a > lo) == (beta > 0)) & ((b < hi) == (alpha > 0))
+            if np.any(use):
+                result[use] = integrate(k, a, b, order, alpha, beta)[use]
+
+    return result
+
+
+def mode_number(w, m2, lo, hi, x0=None, order=32):
+    """Return the (fractional) WKB mode numbers n of frequencies w."""
+    return phase(w, m2, lo, hi, x0, order) / np.pi - 0.5
+
+
+def frequency(n, m2, lo, hi, x0=None, order=32, iters=60):
+    """Return the WKB frequencies of modes n by inverting the quantization.
+
+    The phase increases monotonically with the frequency, so that the
+    condition is solved by a bisection running over all n at once.
+    """
+    n = np.asarray(n, dtype=float)
+    x0 = _minimum(m2, lo, hi) if x0 is None else x0
+    f = lambda w: mode_number(w, m2, lo, hi, x0, order) - n
+
+    # Bracket the roots by doubling the upper bound as needed.
+    inner = np.full(n.shape, np.sqrt(max(m2(np.asarray(x0)), 0)))
+    outer = np.maximum(2 * inner, 1.)
+    while np.any(f(outer) <= 0):
+        outer = np.where(f(outer) <= 0, 2 * outer, outer)
+
+    return _bisect(f, inner, outer, iters)
@@ -1,6 +1,10 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+from math import gcd
+
+import numpy as np
+
 # Brute force.
 total = 0
 for i in range(1, 1000):
@@ -10,11 +14,47 @@ for i in range(1, 1000):
 print("Brute force = {}".format(total))
 
 # Better solution.
-sumn = lambda n: int(n*(n + 1)/2)
-factor = lambda m, n: min(int(m/n), m/n - 1)
+sumn = lambda n: n*(n + 1)//2
+
+def terms(divisors, bound):
+    """Return the (lcm, sign) terms of the inclusion-exclusion sum.
+
+    Only terms whose lcm is below the bound are kept; since the lcm can
+    only grow as divisors are added, a subset whose lcm reaches the bound
+    is not extended any further.
+    """
+    # Multiples of a divisor are already multiples of its factors.
+    divisors = sorted(set(divisors))
+    divisors = [d for d in divisors if not any(d % e == 0 for e in divisors if e < d)]
+
+    result = []
+    def extend(start, lcm, sign):
+        for i in range(start, len(divisors)):
+            l = lcm*divisors[i]//gcd(lcm, divisors[i])
+            if l < bound:
+                result.append((l, sign))
+                extend(i + 1, l, -sign)
+
+    extend(0, 1, 1)
+    return result
+
+def sum_multiples(divisors, bound):
+    """Return the sum of all natural numbers below bound that are
+    multiples of at least one of the divisors."""
+    return sum(sign*l*sumn((bound - 1)//l) for l, sign in terms(divisors, bound))
+
+def sum_multiples_many(divisors, bounds):
+    """Return sum_multiples(divisors, bound) for an array of bounds.
+
+    The result is an array of Python integers, which are exact however
+    large the sums get.
+    """
+    bounds = np.asarray(bounds, dtype=object)
+    total = np.zeros(bounds.shape, dtype=object)
+    for l, sign in terms(divisors, max(bounds.flat, default=0)):
+        m = np.maximum((bounds - 1)//l, 0)
+        total += sign*l*(m*(m + 1)//2)
 
-three = 3*sumn(int(999/3))
-five = 5*sumn(int(999/5))
-fifteen = 15*sumn(int(999/15))
+    return total
 
-print("Better solution = {}".format(three + five - fifteen))
+print("Better solution = {}".format(sum_multiples([3, 5], 1000)))
@@ -0,0 +1,134 @@
+"""Content-addressed on-disk cache for beam eigen-solutions.
+
+Each solution is stored in a directory named after a hash of the
+parameters that define the eigenproblem (E, I, mu, L, N, BCs, curvature
+profile, etc.), including the element matrices themselves, and holds the
+modes and frequencies as .npy files, which are loaded back memory-mapped.
+The modification time of an entry is bumped every time it is used, so
+that the least recently used entries can be evicted once the cache grows
+beyond a given size.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "beamfem")
+
+# Bumped whenever the stored solutions change (e.g., their normalization),
+# so that old entries are no longer found.
+VERSION = 2
+
+
+class Cache:
+    """Cache for beam eigenmodes and frequencies.
+
+    Parameters
+    ----------
+    path : str
+        cache directory
+    maxsize : int
+        maximum total size of the cache in bytes
+    """
+    def __init__(self, path=CACHE_DIR, maxsize=2**30):
+        self.path = path
+        self.maxsize = maxsize
+        os.makedirs(self.path, exist_ok=True)
+
+    def key(self, **params):
+        """Return the hash of the given parameters."""
+        h = hashlib.sha1()
+        h.update("version={}".format(VERSION).encode())
+        for name in sorted(params):
+            value = params[name]
+            h.update(name.encode())
+            if isinstance(value, (np.ndarray, list, tuple)):
+                value = np.ascontiguousarray(value)
+                h.update(str((value.dtype, value.shape)).encode())
+                h.update(value.tobytes())
+            else:
+                h.update(repr(value).encode())
+
+        return h.hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.path, key)
+
+    def load(self, key):
+        """Return (modes, freqs) stored under a key, or None."""
+        entry = self._entry(key)
+        try:
+            modes = np.load(os.path.join(entry, "modes.npy"), mmap_mode="r")
+            freqs = np.load(os.path.join(entry, "freqs.npy"), mmap_mode="r")
+        except FileNotFoundError:
+            return None
+
+        os.utime(entry)
+        return modes, freqs
+
+    def store(self, key, modes, freqs):
+        """Store (modes, freqs) under a key."""
+        # Write to a temporary directory first so that concurrent readers
+        # never see a half-written entry.
+        tmp = tempfile.mkdtemp(dir=self.path, prefix=".tmp")
+        np.save(os.path.join(tmp, "modes.npy"), modes)
+        np.save(os.path.join(tmp, "freqs.npy"), freqs)
+
+        try:
+            os.rename(tmp, self._entry(key))
+        except OSError:
+            # Somebody else stored the same entry in the meantime.
+            shutil.rmtree(tmp)
+
+        self.evict()
+
+    def fetch(self, solve, **params):
+        """Return the cached solution for the parameters, computing it with solve() if needed."""
+        key = self.key(**params)
+        cached = self.load(key)
+        if cached is not None:
+            return cached
+
+        modes, freqs = solve()
+        self.store(key, modes, freqs)
+        return modes, freqs
+
+    def invalidate(self, key=None, **params):
+        """Remove the entry for a key (or parameters) from the cache."""
+        if key is None:
+            key = self.key(**params)
+        shutil.rmtree(self._entry(key), ignore_errors=True)
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        for key in self.entries():
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+
+    def entries(self):
+        """Return the keys of all entries, least recently used first."""
+        keys = [k for k in os.listdir(self.path) if not k.startswith(".")]
+        return sorted(keys, key=lambda k: os.path.getmtime(self._entry(k)))
+
+    def size(self, key=None):
+        """Return the size of an entry (or of the whole cache) in bytes."""
+        keys = self.entries() if key is None else [key]
+        total = 0
+        for k in keys:
+            entry = self._entry(k)
+            for name in os.listdir(entry):
+                total += os.path.getsize(os.path.join(entry, name))
+
+        return total
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in maxsize."""
+        sizes = [(k, self.size(k)) for k in self.entries()]
+        total = sum(s for _, s in sizes)
+        for k, s in sizes:
+            if total <= self.maxsize:
+                break
+            self.invalidate(k)
+            total -= s
@@ -0,0 +1,480 @@
+"""Global assembly of Euler-Bernoulli beam finite elements.
+
+A beam of N Hermite elements has N + 1 nodes and two degrees of freedom
+(displacement, slope) per node, so that element i couples the global
+DOFs 2i, 2i + 1, 2i + 2 and 2i + 3.  Instead of adding the 4x4 element
+matrices one by one into a dense array and deleting the constrained
+rows/columns afterwards, the matrices here are scattered in one go into
+either a sparse CSR matrix or LAPACK upper banded storage (the
+half-bandwidth of the global matrices is 3), and the constrained DOFs
+are dropped by masking the scatter indices.
+
+Since K and M are symmetric positive-(semi)definite and banded, only the
+lowest few modes are computed, either by a subset-selecting symmetric
+dense solver (eigh) or by sparse shift-invert Lanczos (eigsh).
+"""
+
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.linalg as linalg
+import scipy.sparse as sparse
+import scipy.sparse.linalg as splinalg
+
+# Half-bandwidth of the global stiffness/mass matrices.
+BANDWIDTH = 3
+
+# Constrained DOFs for the supported boundary conditions.  Negative
+# indices count from the end of the beam.
+BCS = {
+    "free": [],
+    "cantilever": [0, 1],
+    "clamped": [0, 1, -2, -1],
+    "pinned": [0, -2],
+}
+
+
+def free_dofs(N, bc="free"):
+    """Return the indices of the unconstrained DOFs of an N-element beam."""
+    mask = np.ones(2 * (N+1), dtype=bool)
+    mask[BCS[bc]] = False
+    return np.flatnonzero(mask)
+
+
+def element_matrices(x, EI=1., mu=1., order=4):
+    """Return the stiffness and mass matrices of all elements of a mesh.
+
+    The matrices are integrated with Gauss-Legendre quadrature over all
+    elements at once, so that EI and mu may vary along the beam and the
+    mesh may be non-uniform.  The default order is exact for EI and mu
+    that are linear within each element.
+
+    Parameters
+    ----------
+    x : array_like
+        node positions, shape (N + 1,)
+    EI, mu : float, callable or array_like
+        bending stiffness and mass/length, given either as a constant, a
+        function of x, an (N,) array of per-element values, or an
+        (N, order) array of values at the quadrature points
+    order : int
+        number of quadrature points per element
+
+    Returns
+    -------
+    K_e, M_e : ndarray
+        element stiffness and mass matrices, each of shape (N, 4, 4)
+    """
+    x = np.asarray(x, dtype=float)
+    h = np.diff(x)[:, None]
+
+    # Quadrature points/weights on [0, 1] and their positions on the beam.
+    s, w = np.polynomial.legendre.leggauss(order)
+    s, w = 0.5 * (s+1), 0.5 * w
+    xq = x[:-1, None] + h * s
+    s = np.broadcast_to(s, xq.shape)
+
+    def values(f):
+        if callable(f):
+            return f(xq)
+        f = np.asarray(f, dtype=float)
+        return np.broadcast_to(f[:, None] if f.ndim == 1 else f, xq.shape)
+
+    # Hermite shape functions and their second derivatives with respect
+    # to the local coordinate s, each of shape (N, order, 4).
+    H = np.stack([1 - 3*s**2 + 2*s**3, h * (s - 2*s**2 + s**3),
+                  3*s**2 - 2*s**3, h * (s**3 - s**2)], axis=-1)
+    B = np.stack([12*s - 6, h * (6*s - 4), 6 - 12*s, h * (6*s - 2)], axis=-1)
+
+    K_e = np.einsum("eq,eqi,eqj->eij", w * values(EI) / h**3, B, B)
+    M_e = np.einsum("eq,eqi,eqj->eij", w * values(mu) * h, H, H)
+    return K_e, M_e
+
+
+def _scatter(A_e, N, bc):
+    """Return the (row, col, value, element) entries of the masked global matrix."""
+    A_e = np.broadcast_to(A_e, (N, 4, 4))
+
+    # Global DOFs touched by each element.
+    dofs = 2 * np.arange(N)[:, None] + np.arange(4)
+    rows = np.broadcast_to(dofs[:, :, None], (N, 4, 4)).ravel()
+    cols = np.broadcast_to(dofs[:, None, :], (N, 4, 4)).ravel()
+    vals = A_e.ravel()
+    elems = np.repeat(np.arange(N), 16)
+
+    # Map global DOFs to their position in the reduced system; constrained
+    # DOFs are mapped to -1 and their entries dropped.
+    index = np.full(2 * (N+1), -1)
+    free = free_dofs(N, bc)
+    index[free] = np.arange(len(free))
+    rows, cols = index[rows], index[cols]
+    keep = (rows >= 0) & (cols >= 0)
+
+    return rows[keep], cols[keep], vals[keep], elems[keep], len(free)
+
+
+def assemble(A_e, N, bc="free", fmt="csr"):
+    """Assemble the global matrix of an N-element beam.
+
+    Parameters
+    ----------
+    A_e : array_like
+        element matrix, either a single (4, 4) array used for all
+        elements or an (N, 4, 4) array of per-element matrices
+    N : int
+        number of elements
+    bc : str
+        boundary condition (one of the keys of BCS)
+    fmt : str
+        "csr" for a sparse CSR matrix, "banded" for LAPACK upper banded
+        storage of shape (BANDWIDTH + 1, n) as used by eig_banded(), or
+        "dense" for a NumPy array
+
+    Returns
+    -------
+    A : sparse matrix or ndarray
+        global matrix with the constrained DOFs removed
+    """
+    rows, cols, vals, _, n = _scatter(A_e, N, bc)
+
+    if fmt == "banded":
+        # Upper form: ab[u + i - j, j] = a[i, j] for i <= j.
+        upper = rows <= cols
+        rows, cols, vals = rows[upper], cols[upper], vals[upper]
+        flat = (BANDWIDTH + rows - cols) * n + cols
+        ab = np.bincount(flat, weights=vals, minlength=(BANDWIDTH + 1) * n)
+        return ab.reshape(BANDWIDTH + 1, n)
+
+    A = sparse.coo_matrix((vals, (rows, cols)), shape=(n, n)).tocsr()
+    if fmt == "csr":
+        return A
+    elif fmt == "dense":
+        return A.toarray()
+    else:
+        raise ValueError("unknown format '{}'".format(fmt))
+
+
+def expand(modes, N, bc="free"):
+    """Return nodal displacements from modes of the reduced system.
+
+    The modes are given as rows (or a single vector) over the free DOFs;
+    the constrained DOFs are filled in with zeros and the slopes are
+    discarded, giving an array of N + 1 displacements per mode.
+    """
+    modes = np.asarray(modes)
+    u = np.zeros(modes.shape[:-1] + (2 * (N+1),), dtype=modes.dtype)
+    u[..., free_dofs(N, bc)] = modes
+    return u[..., ::2]
+
+
+def interpolate(modes, N, N_new, L, bc="free"):
+    """Interpolate modes of an N-element beam onto an N_new-element beam.
+
+    The displacement and slope at the new nodes are found by evaluating
+    the cubic Hermite shape functions of the old elements, so that the
+    interpolated modes are exact wherever the old modes are.
+    """
+    modes = np.asarray(modes)
+    full = np.zeros(modes.shape[:-1] + (2 * (N+1),), dtype=modes.dtype)
+    full[..., free_dofs(N, bc)] = modes
+    u, t = full[..., ::2], full[..., 1::2]
+
+    # Element and local coordinate of each new node.
+    h = L / N
+    x = np.linspace(0, L, N_new + 1)
+    e = np.minimum((x / h).astype(int), N - 1)
+    s = x/h - e
+
+    # Hermite shape functions and their derivatives.
+    H = [1 - 3*s**2 + 2*s**3, h * (s - 2*s**2 + s**3), 3*s**2 - 2*s**3, h * (s**3 - s**2)]
+    dH = [(6*s**2 - 6*s) / h, 1 - 4*s + 3*s**2, (6*s - 6*s**2) / h, 3*s**2 - 2*s]
+    dofs = [u[..., e], t[..., e], u[..., e + 1], t[..., e + 1]]
+
+    new = np.zeros(modes.shape[:-1] + (2 * (N_new+1),), dtype=modes.dtype)
+    new[..., ::2] = sum(a * b for a, b in zip(H, dofs))
+    new[..., 1::2] = sum(a * b for a, b in zip(dH, dofs))
+    return new[..., free_dofs(N_new, bc)]
+
+
+def _eigen_dense(K, M, k, window):
+    """Partial spectrum of the dense pencil (K, M) using eigh()."""
+    if sparse.issparse(K):
+        K, M = K.toarray(), M.toarray()
+
+    if window is not None:
+        evals, evecs = linalg.eigh(K, M, subset_by_value=(window[0]**2, window[1]**2))
+    elif k is not None:
+        evals, evecs = linalg.eigh(K, M, subset_by_index=(0, min(k, len(K)) - 1))
+    else:
+        evals, evecs = linalg.eigh(K, M)
+
+    return evals[:k], evecs[:, :k]
+
+
+def _eigen_sparse(K, M, k, window, sigma):
+    """Partial spectrum of the sparse pencil (K, M) using shift-invert."""
+    n = K.shape[0]
+
+    if window is None:
+        sigma = 0. if sigma is None else sigma
+        if k is None or k >= n - 1:
+            return _eigen_dense(K, M, k, window)
+        evals, evecs = splinalg.eigsh(K, k, M, sigma=sigma, which="LM")
+    else:
+        # Look for eigenvalues near the middle of the window, asking for
+        # more of them until the farthest one found lies outside.
+        lo, hi = window[0]**2, window[1]**2
+        sigma = 0.5 * (lo+hi) if sigma is None else sigma
+        radius = max(sigma - lo, hi - sigma)
+        nev = 8 if k is None else k
+        while True:
+            if nev >= n - 1:
+                return _eigen_dense(K, M, k, window)
+            evals, evecs = splinalg.eigsh(K, nev, M, sigma=sigma, which="LM")
+            if np.abs(evals - sigma).max() > radius:
+                break
+            nev *= 2
+
+        inside = (evals >= lo) & (evals <= hi)
+        evals, evecs = evals[inside], evecs[:, inside]
+
+    i = np.argsort(evals)[:k]
+    return evals[i], evecs[:, i]
+
+
+def eigen(K, M, k=None, window=None, sigma=None):
+    """Find the lowest eigenmodes and frequencies of the pencil (K, M).
+
+    Parameters
+    ----------
+    K, M : sparse matrix or ndarray
+        global stiffness and mass matrix (with BCs applied)
+    k : int, optional
+        number of modes to find (all of them if not given)
+    window : (float, float), optional
+        only find modes with frequencies in this range
+    sigma : float, optional
+        shift used for sparse shift-invert (by default 0 or the middle
+        of the window in terms of squared frequencies); needs to be
+        negative if K is singular, e.g., with free BCs
+
+    Returns
+    -------
+    modes : ndarray
+        modes (one per row) in ascending order of frequency, normalized
+        to unit 2-norm (as returned by linalg.eig), not M-normalized
+    freqs : ndarray
+        frequencies (square root of the eigenvalues)
+    """
+    if sparse.issparse(K):
+        evals, evecs = _eigen_sparse(sparse.csc_matrix(K), sparse.csc_matrix(M), k, window, sigma)
+    else:
+        evals, evecs = _eigen_dense(K, M, k, window)
+
+    evecs = evecs / np.linalg.norm(evecs, axis=0)
+    return evecs.T, np.sqrt(np.abs(evals))
+
+
+def refine(matrices, N, L, k=5, bc="free", tol=1e-6, factor=2, maxiter=10):
+    """Refine the mesh until the lowest k frequencies converge.
+
+    The mesh is refined by the given factor at each step.  The modes of
+    the previous mesh, interpolated onto the new one, are used as the
+    starting block for LOBPCG (preconditioned by a sparse factorization
+    of K), so that each refinement needs only a few iterations.  If
+    LOBPCG does not converge, the modes are found by eigen() instead.  A
+    RuntimeWarning is issued if the frequencies have not converged after
+    maxiter refinements.
+
+    Parameters
+    ----------
+    matrices : callable
+        matrices(N) returns the sparse (K, M) of an N-element beam
+    N : int
+        initial number of elements
+    L : float
+        total length
+    k : int
+        number of modes to converge
+    bc : str
+        boundary condition (one of the keys of BCS); K should be
+        nonsingular, so "free" beams need a shifted K
+    tol : float
+        relative tolerance on the frequencies
+    factor : int
+        refinement factor
+    maxiter : int
+        maximum number of refinements
+
+    Returns
+    -------
+    N : int
+        number of elements of the final mesh
+    modes : ndarray
+        modes (one per row) in ascending order of frequency, normalized
+        as in eigen()
+    freqs : ndarray
+        frequencies
+    """
+    K, M = matrices(N)
+    modes, freqs = eigen(K, M, k=k)
+    converged = False
+
+    for _ in range(maxiter):
+        N_new = factor * N
+        K, M = matrices(N_new)
+        X = interpolate(modes, N, N_new, L, bc).T
+
+        lu = splinalg.splu(sparse.csc_matrix(K))
+        T = splinalg.LinearOperator(K.shape, matvec=lu.solve, matmat=lu.solve, dtype=K.dtype)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            evals, evecs = splinalg.lobpcg(K, X, B=M, M=T, largest=False, maxiter=50)
+
+        # The error in the eigenvalues goes as the square of the relative
+        # residuals, so these have to be below sqrt(tol).
+        MV = M @ evecs
+        res = np.linalg.norm(K @ evecs - MV * evals, axis=0) / np.linalg.norm(MV * evals, axis=0)
+        if np.all(res <= np.sqrt(tol)):
+            i = np.argsort(evals)
+            new_modes = (evecs / np.linalg.norm(evecs, axis=0))[:, i].T
+            new_freqs = np.sqrt(np.abs(evals[i]))
+        else:
+            new_modes, new_freqs = eigen(K, M, k=k)
+
+        converged = np.all(np.abs(new_freqs - freqs) <= tol * new_freqs)
+        N, modes, freqs = N_new, new_modes, new_freqs
+        if converged:
+            break
+
+    if not converged:
+        warnings.warn("frequencies did not converge to tol={} after {} refinements (N={})".format(
+            tol, maxiter, N), RuntimeWarning)
+
+    return N, modes, freqs
+
+
+# Sparsity pattern and mass matrix shared with the sweep worker processes.
+_worker = dict()
+
+
+def _init_worker(indptr, indices, M):
+    _worker.update(indptr=indptr, indices=indices, M=M)
+
+
+def _solve_worker(data, k):
+    K = sparse.csr_matrix((data, _worker["indices"], _worker["indptr"]), shape=_worker["M"].shape)
+    return eigen(K, _worker["M"], k=k)
+
+
+class Sweep:
+    """Solve the beam eigenproblem for many element-wise profiles m2.
+
+    The stiffness matrix is K = K_e + m2[i] * A_e on element i.  Since it
+    is linear in m2, the parameter independent part (the sparsity pattern,
+    the K_e contribution and the mass matrix) is assembled only once, and
+    the CSR data for a whole stack of profiles is obtained by a single
+    sparse product with a precomputed m2 -> data map.
+
+    Parameters
+    ----------
+    K_e, A_e, M_e : array_like
+        element stiffness, m2-weighted and mass matrices, each either
+        (4, 4) or (N, 4, 4)
+    N : int
+        number of elements
+    bc : str
+        boundary condition (one of the keys of BCS)
+    """
+    def __init__(self, K_e, A_e, M_e, N, bc="free"):
+        self.N, self.bc = N, bc
+        self.M = assemble(M_e, N, bc).tocsc()
+
+        # Sparsity pattern of K (with sorted column indices).
+        rows, cols, _, elems, n = _scatter(np.ones((4, 4)), N, bc)
+        pattern = sparse.coo_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n)).tocsr()
+        pattern.sort_indices()
+        self.indptr, self.indices = pattern.indptr, pattern.indices
+
+        # Position of every element entry in the CSR data array.
+        nnz_rows = np.repeat(np.arange(n), np.diff(self.indptr))
+        pos = np.searchsorted(nnz_rows * n + self.indices, rows * n + cols)
+
+        _, _, vals, _, _ = _scatter(K_e, N, bc)
+        self.data0 = np.bincount(pos, weights=vals, minlength=pattern.nnz)
+
+        _, _, vals, _, _ = _scatter(A_e, N, bc)
+        self.m2map = sparse.csr_matrix((vals, (pos, elems)), shape=(pattern.nnz, N))
+
+    def data(self, m2):
+        """Return the CSR data of K for profiles m2 of shape (P, N)."""
+        return (self.data0[:, None] + self.m2map @ np.asarray(m2, dtype=float).T).T
+
+    def stiffness(self, m2):
+        """Return the stiffness matrix for a single profile m2."""
+        data = self.data(np.atleast_2d(m2))[0]
+        return sparse.csr_matrix((data, self.indices, self.indptr), shape=self.M.shape)
+
+    def solve(self, m2, k=10, workers=None):
+        """Find the lowest k modes for a stack of profiles.
+
+        Parameters
+        ----------
+        m2 : array_like
+            profiles of shape (..., N), e.g., (P, N) for a list of
+            profiles or (len(C), len(eps), N) for a parameter grid
+        k : int
+            number of modes per profile
+        workers : int, optional
+            number of worker processes (1 to solve serially)
+
+        Returns
+        -------
+        modes : ndarray
+            modes of shape (..., k, n)
+        freqs : ndarray
+            frequencies of shape (..., k)
+        """
+        m2 = np.asarray(m2, dtype=float)
+        shape = m2.shape[:-1]
+        data = self.data(m2.reshape(-1, self.N))
+
+        if workers == 1 or len(data) == 1:
+            _init_worker(self.indptr, self.indices, self.M)
+            results = [_solve_worker(d, k) for d in data]
+        else:
+            with ProcessPoolExecutor(max_workers=workers,
+                                     initializer=_init_worker,
+                                     initargs=(self.indptr, self.indices, self.M)) as pool:
+                chunksize = max(1, len(data) // (4 * (workers or os.cpu_count())))
+                results = list(pool.map(_solve_worker, data, [k] * len(data), chunksize=chunksize))
+
+        modes = np.stack([r[0] for r in results])
+        freqs = np.stack([r[1] for r in results])
+        return modes.reshape(shape + modes.shape[1:]), freqs.reshape(shape + freqs.shape[1:])
+
+    def grid(self, profile, x, *params, k=10, workers=None):
+        """Find the lowest k modes for a profile on a grid of parameters.
+
+        Parameters
+        ----------
+        profile : callable
+            profile(x, *params) giving m2 at the points x, e.g.,
+            lambda x, C, eps: C**2 * np.tanh(eps * x)**2
+        x : array_like
+            middle point of each element
+        *params : array_like
+            values of each parameter, spanning a (len(p1), len(p2), ...) grid
+        k : int
+            number of modes per profile
+        workers : int, optional
+            number of worker processes (1 to solve serially)
+
+        Returns modes of shape (len(p1), len(p2), ..., k, n) and frequencies
+        of shape (len(p1), len(p2), ..., k), as from solve().
+        """
+        grid = np.meshgrid(*params, indexing="ij")
+        m2 = profile(np.asarray(x, dtype=float), *[p[..., None] for p in grid])
+        return self.solve(m2, k=k, workers=workers)
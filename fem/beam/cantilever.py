@@ -2,7 +2,9 @@
 
 import matplotlib.pyplot as plt
 import numpy as np
-import scipy.linalg as linalg
+
+import beamcache
+import beamfem
 
 E = 1.                     # elastic modulus
 I = 1.                     # moment of area
@@ -24,34 +26,26 @@ K_e = E * I / h**3 * np.array([
 ])
 M_e = mu * h / 420 * np.array([
     [156, 22 * h, 54, -13 * h],
-    [22 * h, 4 * h**2, -13 * h, -3 * h**2],
+    [22 * h, 4 * h**2, 13 * h, -3 * h**2],
     [54, 13 * h, 156, -22 * h],
     [-13 * h, -3 * h**2, -22 * h, 4 * h**2]
 ])
 
-K = np.zeros((2 * (N+1), 2 * (N+1)))
-M = np.zeros((2 * (N+1), 2 * (N+1)))
-
-# Assemble global stiffness/mass matrix.
-for i in range(1, N + 1):
-    K[2 * (i-1):2 * (i-1) + 4][:, 2 * (i-1):2 * (i-1) + 4] += K_e
-    M[2 * (i-1):2 * (i-1) + 4][:, 2 * (i-1):2 * (i-1) + 4] += M_e
+def solve():
+    # Assemble global stiffness/mass matrix with cantilever BCs.
+    K = beamfem.assemble(K_e, N, bc="cantilever")
+    M = beamfem.assemble(M_e, N, bc="cantilever")
 
-# Cantilever BCs.
-K = np.delete(K, [0, 1], 0)
-K = np.delete(K, [0, 1], 1)
-M = np.delete(M, [0, 1], 0)
-M = np.delete(M, [0, 1], 1)
+    # Find the lowest eigenvalues and eigenvectors.
+    return beamfem.eigen(K, M, k=5)
 
-# Find eigenvalues and eigenvectors.
-freqs, modes = linalg.eig(K, M)
-i = np.argsort(freqs)
-# The freqs matrix has to be transposed before sorting.
-modes, freqs = modes.T[i].real, np.sqrt(freqs[i].real)
+# Reuse the solution from an earlier run if there is one.
+modes, freqs = beamcache.Cache().fetch(solve, E=E, I=I, mu=mu, L=L, N=N, bc="cantilever", k=5,
+                                      K_e=K_e, M_e=M_e)
 
 for i in range(5):
     # Cantilever.
-    u = np.hstack([0., modes[i][0:2*nodes - 2:2]])
+    u = beamfem.expand(modes[i], N, bc="cantilever")
     u = np.sign(u.mean()) * u
     plt.plot(x, u, label="$m = {}$".format(i + 1))
 
@@ -3,102 +3,575 @@
 """Find the faces of a graph given nodes and edges."""
 
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
 import numpy as np
 import matplotlib.pyplot as plt
+from scipy import sparse
+from scipy.sparse import csgraph
+
+# Number of arcs processed at a time when computing angles, and the
+# smallest number of arcs for which faces are traced in parallel.
+CHUNK = 2**20
+
+def _label(nxt, itype):
+    """Label the arcs by face, numbering faces in order of their smallest arc."""
+    # Label every arc with the smallest arc in its face by pointer
+    # jumping along nxt, which takes O(log n) sweeps.
+    n = len(nxt)
+    label, jump = np.arange(n, dtype=itype), nxt.copy()
+    for _ in range(int(np.ceil(np.log2(max(n, 2))))):
+        label = np.minimum(label, label[jump])
+        jump = jump[jump]
+
+    return np.unique(label, return_inverse=True)[1].astype(itype)
+
+def _rank(nxt, face, itype):
+    """Return the distance of every arc to the end of its face."""
+    n = len(nxt)
+    nf = face.max() + 1 if n else 0
+    root = np.full(nf, n, dtype=itype)
+    np.minimum.at(root, face, np.arange(n, dtype=itype))
+
+    # Cut each face open before its smallest arc and find the distance
+    # of every arc to the end of the cut open face (list ranking).
+    end = nxt == root[face]
+    dist = np.where(end, 0, 1).astype(itype)
+    jump = np.where(end, np.arange(n, dtype=itype), nxt)
+    for _ in range(int(np.ceil(np.log2(max(n, 2))))):
+        dist = dist + dist[jump]
+        jump = jump[jump]
+
+    return dist
+
+def _share(a):
+    """Copy an array to a new block of shared memory."""
+    m = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+    b = np.ndarray(a.shape, dtype=a.dtype, buffer=m.buf)
+    b[:] = a
+    return m, b
+
+# Shared arrays (nxt, order, face, dist) attached by the worker processes.
+_worker = dict()
+
+def _init_worker(spec):
+    _worker["shm"] = [shared_memory.SharedMemory(name=name) for name, _, _ in spec]
+    _worker["arrays"] = [np.ndarray(n, dtype=dtype, buffer=m.buf)
+                         for m, (_, dtype, n) in zip(_worker["shm"], spec)]
+
+def _trace_worker(lo, hi):
+    """Trace the faces of the arcs order[lo:hi] and return their number."""
+    nxt, order, face, dist = _worker["arrays"]
+    if lo == hi:
+        return 0
+
+    # The arcs of the batch are sorted, so that their successors can be
+    # renumbered locally by a binary search.
+    sub = order[lo:hi]
+    local = np.searchsorted(sub, nxt[sub]).astype(sub.dtype)
+    face[lo:hi] = _label(local, sub.dtype)
+    dist[lo:hi] = _rank(local, face[lo:hi], sub.dtype)
+    return int(face[lo:hi].max()) + 1
 
 class Graph(object):
-    """Graph class with helper functions to find faces, borders, etc."""
-    def __init__(self, coords, edges):
+    """Graph class with helper functions to find faces, borders, etc.
+
+    Faces of graphs with more than CHUNK arcs are traced in parallel by
+    the given number of worker processes (None for all CPUs, 1 to trace
+    serially).
+    """
+    def __init__(self, coords, edges, workers=1):
         self.coords, self.edges = coords, edges
+        self.workers = workers
         self.rs, self.fs, self.br = None, None, None
+        self.he, self.ft, self.gm = None, None, None
+        self.face, self._buf = None, None
+
+        # Vertex/arc indices are stored as int32 whenever possible.
+        if max(len(coords), 2 * len(edges)) < 2**31:
+            self.itype = np.int32
+        else:
+            self.itype = np.int64
+
+    @classmethod
+    def fromfile(cls, coords_file, edges_file, coords_dtype=np.float64, edges_dtype=np.int32, workers=1):
+        """Load a graph from files of coordinates and edges.
 
-    def _angle(self, r):
-        """Return the counter-clockwise angle of position vector r."""
-        return np.arctan2(r[1], r[0]) % (2 * np.pi)
+        The files are either .npy files or raw binary files of (x, y) and
+        (v1, v2) pairs of the given types.  Both are memory-mapped rather
+        than read into memory.
+        """
+        def load(fname, dtype):
+            if fname.endswith(".npy"):
+                return np.load(fname, mmap_mode="r")
+            else:
+                return np.memmap(fname, dtype=dtype, mode="r").reshape(-1, 2)
 
-    def _area(self, face):
-        """Area of a face (Shoelace formula)."""
-        v = np.asarray(face)[:, 0]
-        x, y = self.coords[v].T
-        return 0.5 * abs(np.dot(x, np.roll(y, 1)) - np.dot(np.roll(x, 1), y))
+        return cls(load(coords_file, coords_dtype), load(edges_file, edges_dtype), workers)
 
     def rotsys(self):
-        """Return the clockwise rotation system of a graph."""
+        """Return the clockwise rotation system of a graph.
+
+        The rotation system is returned in CSR form as (indptr, neighbors),
+        with the neighbors of vertex v in clockwise order given by
+        neighbors[indptr[v]:indptr[v + 1]].
+        """
         if self.rs:
             return self.rs
 
-        rs = dict()
+        # Collect both orientations of all edges.  After incremental
+        # updates, the edges are recovered from the arcs.
+        edges = self.edges
+        if edges is None:
+            src, dst, twin, _ = self.he
+            first = np.arange(len(src)) < twin
+            edges = np.column_stack([src[first], dst[first]])
+        src = np.concatenate([edges[:, 0], edges[:, 1]]).astype(self.itype, copy=False)
+        dst = np.concatenate([edges[:, 1], edges[:, 0]]).astype(self.itype, copy=False)
 
-        # Collect vertices to form a vertex -> neighbors dictionary.
-        for v1, v2 in self.edges:
-            if v1 in rs:
-                rs[v1].append(v2)
-            else:
-                rs[v1] = [v2]
+        # Fixing each vertex as the origin, find the counter-clockwise
+        # angle of the position vector to its neighbors.  This is done in
+        # chunks to keep the temporaries small.
+        angles = np.empty(len(src))
+        for i in range(0, len(src), CHUNK):
+            r = self.coords[dst[i:i + CHUNK]] - self.coords[src[i:i + CHUNK]]
+            angles[i:i + CHUNK] = np.arctan2(r[:, 1], r[:, 0]) % (2 * np.pi)
 
-            if v2 in rs:
-                rs[v2].append(v1)
-            else:
-                rs[v2] = [v1]
+        # Sort neighbors by vertex and in descending order of the
+        # counter-clockwise angle.  This is the clockwise ordering of
+        # neighbors.
+        order = np.lexsort((-angles, src))
+        counts = np.bincount(src, minlength=len(self.coords))
+        indptr = np.r_[0, np.cumsum(counts)]
 
-        for vertex, neighbors in rs.items():
-            # Fixing the current vertex as the origin, find the position vector
-            # to its neighbors and find the counter-clockwise angle.
-            r = self.coords[neighbors] - self.coords[vertex]
-            angles = np.apply_along_axis(self._angle, 1, r)
+        self.rs = indptr, dst[order]
+        return self.rs
 
-            # Sort neighbors in descending order of the counter-clockwise
-            # angle.  This is the clockwise ordering of neighbors.
-            neighbors = np.asarray(neighbors, dtype=np.dtype(int))
-            rs[vertex] = neighbors[np.argsort(angles)[::-1]]
+    def halfedges(self):
+        """Return the half-edge representation of the graph.
 
-        self.rs = rs
-        return self.rs
+        Every edge (v1, v2) gives rise to two arcs (half-edges) v1 -> v2 and
+        v2 -> v1.  The arcs are returned as the integer arrays (src, dst,
+        twin, nxt), where twin[a] is the reverse of arc a and nxt[a] is the
+        arc that follows a when walking along the boundary of its face.
+        The arcs are initially sorted by their origin and then clockwise
+        around it (as in the rotation system); this no longer holds after
+        incremental updates.
+        """
+        if self.he:
+            return self.he
+
+        indptr, dst = self.rotsys()
+        nv = len(indptr) - 1
+        src = np.repeat(np.arange(nv, dtype=self.itype), np.diff(indptr))
+
+        # Find the twin of every arc by looking up (dst, src) among the
+        # sorted (src, dst) keys.
+        keys = src.astype(np.int64) * nv + dst
+        sort = np.argsort(keys)
+        twin = sort[np.searchsorted(keys[sort], dst.astype(np.int64) * nv + src)]
+        twin = twin.astype(self.itype)
+        del keys, sort
+
+        # Clockwise successor of each arc around its origin.
+        succ = np.arange(1, len(src) + 1, dtype=self.itype)
+        last = indptr[1:][np.diff(indptr) > 0] - 1
+        succ[last] = indptr[:-1][np.diff(indptr) > 0]
+
+        # The next arc after v1 -> v2 leaves v2 towards the neighbor that
+        # comes after v1 in the clockwise ordering around v2.
+        nxt = succ[twin]
+
+        self.he = src, dst, twin, nxt
+        return self.he
+
+    def facetable(self):
+        """Return the faces as a flat array of arcs and face offsets.
+
+        The arcs of face i are arcs[offsets[i]:offsets[i + 1]], listed in
+        the order in which the boundary of the face is traversed.
+        """
+        if self.ft:
+            return self.ft
+
+        src, dst, _, nxt = self.halfedges()
+        n = len(nxt)
+
+        if self.face is None and self.workers != 1 and n > CHUNK:
+            self.face, dist = self._trace(src, dst, nxt)
+        else:
+            if self.face is None:
+                self.face = _label(nxt, self.itype)
+            dist = _rank(nxt, self.face, self.itype)
+
+        face = self.face
+        nf = face.max() + 1 if n else 0
+        arcs = np.lexsort((-dist, face)).astype(self.itype)
+        offsets = np.r_[0, np.cumsum(np.bincount(face, minlength=nf))]
+
+        self.ft = arcs, offsets
+        return self.ft
+
+    def _trace(self, src, dst, nxt):
+        """Trace the faces of groups of connected components in parallel.
+
+        A face never leaves the connected component it lies in, so the
+        components are grouped into batches of about equal numbers of arcs
+        that are traced independently by worker processes.  The arrays are
+        passed to the workers through shared memory.  Returns the face
+        labels and list ranks of all arcs, exactly as the serial version.
+        """
+        n, nv = len(nxt), len(self.coords)
+        workers = self.workers or os.cpu_count()
+
+        graph = sparse.coo_matrix((np.ones(n, dtype=np.int8), (src, dst)), shape=(nv, nv))
+        _, comp = csgraph.connected_components(graph, directed=False)
+        comp = comp[src]
+
+        # Assign the components, in order, to batches of about n/nbatch arcs
+        # each and sort the arcs by batch (and by index within a batch).
+        nbatch = 4 * workers
+        sizes = np.bincount(comp)
+        batch = ((np.cumsum(sizes) - sizes) * nbatch // n)[comp]
+        order = np.argsort(batch, kind="stable").astype(self.itype)
+        bounds = np.searchsorted(batch[order], np.arange(nbatch + 1))
+        del comp, batch
+
+        shm = [_share(a) for a in (nxt, order,
+                                   np.empty(n, dtype=self.itype),
+                                   np.empty(n, dtype=self.itype))]
+        try:
+            spec = [(m.name, a.dtype, n) for m, a in shm]
+            with ProcessPoolExecutor(max_workers=workers,
+                                     initializer=_init_worker,
+                                     initargs=(spec,)) as pool:
+                nfaces = list(pool.map(_trace_worker, bounds[:-1], bounds[1:]))
+
+            face_local, dist_local = shm[2][1], shm[3][1]
+
+            # Faces are numbered within each batch; shift them to global
+            # numbers and then renumber all faces in order of their smallest
+            # arc, which is what the serial version does.
+            shift = np.repeat(np.r_[0, np.cumsum(nfaces)[:-1]], np.diff(bounds))
+            face, dist = np.empty(n, dtype=self.itype), np.empty(n, dtype=self.itype)
+            face[order] = face_local + shift
+            dist[order] = dist_local
+        finally:
+            for m, _ in shm:
+                m.close()
+                m.unlink()
+
+        root = np.full(sum(nfaces), n, dtype=self.itype)
+        np.minimum.at(root, face, np.arange(n, dtype=self.itype))
+        rank = np.empty_like(root)
+        rank[np.argsort(root)] = np.arange(len(root), dtype=self.itype)
+
+        return rank[face], dist
 
     def faces(self):
         """Find faces of a given graph."""
         if self.fs:
             return self.fs
 
-        rs = self.rotsys()
+        src, dst, _, _ = self.halfedges()
+        arcs, offsets = self.facetable()
+        path = list(zip(src[arcs].tolist(), dst[arcs].tolist()))
+
+        self.fs = [path[i:j] for i, j in zip(offsets[:-1], offsets[1:])]
+        return self.fs
+
+    def iterfaces(self, batch=None):
+        """Yield the faces as int32 arrays of vertices.
+
+        If batch is given, yield (vertices, offsets) for up to batch faces
+        at a time, where the vertices of the i-th face of the batch are
+        vertices[offsets[i]:offsets[i + 1]].
+        """
+        src, _, _, _ = self.halfedges()
+        arcs, offsets = self.facetable()
 
-        # Build the set of arcs.
-        arcs = set()
-        for e in self.edges:
-            arcs |= set([tuple(e), tuple(e[::-1])])
+        if batch is None:
+            for i, j in zip(offsets[:-1], offsets[1:]):
+                yield src[arcs[i:j]].astype(np.int32)
+        else:
+            for k in range(0, len(offsets) - 1, batch):
+                o = offsets[k:k + batch + 1]
+                yield src[arcs[o[0]:o[-1]]].astype(np.int32), (o - o[0]).astype(np.int32)
 
-        fs = list()
-        while arcs:
-            e1 = arcs.pop()
-            path = [e1]
+    def _dynamic(self):
+        """Switch to growable arrays that allow incremental updates."""
+        if self._buf is not None:
+            return
 
-            while True:
-                # Get the neighbors of the current node.
-                v1, v2 = path[-1]
-                neighbors = rs[v2].tolist()
+        src, dst, twin, nxt = self.halfedges()
+        arcs, offsets = self.facetable()
+        areas, centroids, perimeters = self.geometry()
 
-                # The next node is the node appearing after the previous node
-                # in the clockwise ordering of the current node.
-                ix = (neighbors.index(v1) + 1) % len(neighbors)
-                e2 = (v2, neighbors[ix])
+        self._buf = dict(src=src, dst=dst, twin=twin, nxt=nxt, face=self.face,
+                         area=areas, centroid=centroids, perimeter=perimeters,
+                         root=arcs[offsets[:-1]])
+        self._na, self._nf = len(src), len(areas)
+        self._reserve(self._na, self._nf)
 
-                if e2 == e1:
-                    fs.append(path)
-                    break
+        # Some arc leaving each vertex (-1 for isolated vertices).
+        self.out = np.full(len(self.coords), -1, dtype=self.itype)
+        self.out[src[::-1]] = np.arange(len(src) - 1, -1, -1, dtype=self.itype)
+
+    def _reserve(self, na, nf):
+        """Make room for na arcs and nf faces."""
+        for key, buf in self._buf.items():
+            n = nf if key in ("area", "centroid", "perimeter", "root") else na
+            if len(buf) < n or not buf.flags.owndata:
+                new = np.empty((2 * n,) + buf.shape[1:], dtype=buf.dtype)
+                new[:len(buf)] = buf
+                self._buf[key] = new
+
+        self._views()
+
+    def _views(self):
+        """Point the cached arrays to the used part of the buffers."""
+        b, na, nf = self._buf, self._na, self._nf
+        self.he = b["src"][:na], b["dst"][:na], b["twin"][:na], b["nxt"][:na]
+        self.face = b["face"][:na]
+        self.gm = b["area"][:nf], b["centroid"][:nf], b["perimeter"][:nf]
+
+        # The list of faces is patched by _relabel(); everything else has
+        # to be recomputed when needed.
+        self.edges, self.rs, self.ft, self.br = None, None, None, None
+
+    def _rotation(self, v):
+        """Return the arcs leaving v in clockwise order."""
+        _, _, twin, nxt = self.he
+        first = self.out[v]
+        if first < 0:
+            return []
+
+        arcs, a = [first], nxt[twin[first]]
+        while a != first:
+            arcs.append(a)
+            a = nxt[twin[a]]
+
+        return arcs
+
+    def _arc(self, v1, v2):
+        """Return the arc v1 -> v2 (or -1 if there is no such arc)."""
+        dst = self.he[1]
+        for a in self._rotation(v1):
+            if dst[a] == v2:
+                return a
+
+        return -1
+
+    def _relabel(self, starts, old):
+        """Assign faces to the cycles through the given arcs.
+
+        The faces in old are reused for the new cycles; new faces are added
+        or surplus faces are removed as needed.
+        """
+        b = self._buf
+        nxt = b["nxt"]
+
+        cycles = []
+        for a in starts:
+            if any(a in c for c in cycles):
+                continue
+            c, x = [a], nxt[a]
+            while x != a:
+                c.append(x)
+                x = nxt[x]
+            cycles.append(c)
+
+        faces = sorted(old)
+        while len(faces) < len(cycles):
+            self._reserve(self._na, self._nf + 1)
+            faces.append(self._nf)
+            self._nf += 1
+
+        for c, f in zip(cycles, faces):
+            c = np.asarray(c)
+            if self.fs:
+                path = list(zip(b["src"][c].tolist(), b["dst"][c].tolist()))
+                if f < len(self.fs):
+                    self.fs[f] = path
                 else:
-                    arcs -= set([e2])
-                    path.append(e2)
+                    self.fs.append(path)
+            b["face"][c] = f
+            b["root"][f] = c[0]
+            area, centroid, perimeter = self._geometry(c, [0])
+            b["area"][f], b["centroid"][f], b["perimeter"][f] = area[0], centroid[0], perimeter[0]
 
-        self.fs = fs
-        return self.fs
+        # Remove surplus faces by moving the last face into their place.
+        for f in sorted(faces[len(cycles):], reverse=True):
+            last = self._nf - 1
+            if f != last:
+                c, x = [b["root"][last]], nxt[b["root"][last]]
+                while x != c[0]:
+                    c.append(x)
+                    x = nxt[x]
+                b["face"][c] = f
+                for key in ("area", "centroid", "perimeter", "root"):
+                    b[key][f] = b[key][last]
+                if self.fs:
+                    self.fs[f] = self.fs[last]
+            if self.fs:
+                self.fs.pop()
+            self._nf -= 1
+
+        self._views()
+
+    def _delete(self, a):
+        """Delete an (already unlinked) arc by moving the last arc into its place."""
+        b = self._buf
+        last = self._na - 1
+        if a != last:
+            # The arc whose next arc is the last arc.
+            rot = self._rotation(b["src"][last])
+            prev = b["twin"][rot[rot.index(last) - 1]]
+
+            for key in ("src", "dst", "twin", "nxt", "face"):
+                b[key][a] = b[key][last]
+            b["twin"][b["twin"][a]] = a
+            b["nxt"][prev] = a
+            if self.out[b["src"][a]] == last:
+                self.out[b["src"][a]] = a
+            if b["root"][b["face"][a]] == last:
+                b["root"][b["face"][a]] = a
+
+        self._na -= 1
+        self._views()
+
+    def add_edge(self, v1, v2):
+        """Add the edge (v1, v2) and update the faces it touches.
+
+        The new edge is inserted into the rotation systems of v1 and v2,
+        and only the one or two faces it splits or merges are retraced.
+        """
+        self._dynamic()
+        if self._arc(v1, v2) >= 0:
+            raise ValueError("edge ({}, {}) already exists".format(v1, v2))
+
+        a1, a2 = self._na, self._na + 1
+        self._reserve(self._na + 2, self._nf)
+        b = self._buf
+        b["src"][a1], b["dst"][a1], b["twin"][a1] = v1, v2, a2
+        b["src"][a2], b["dst"][a2], b["twin"][a2] = v2, v1, a1
+
+        old, starts = set(), [a1, a2]
+        for u, v, new in ((v1, v2, a1), (v2, v1, a2)):
+            rot = self._rotation(u)
+            if not rot:
+                b["nxt"][b["twin"][new]] = new
+                self.out[u] = new
+                continue
+
+            # The new arc comes right after the arc closest to it in the
+            # counter-clockwise direction.
+            r = self.coords[b["dst"][rot]] - self.coords[u]
+            r0 = self.coords[v] - self.coords[u]
+            delta = (np.arctan2(r[:, 1], r[:, 0]) - np.arctan2(r0[1], r0[0])) % (2 * np.pi)
+            p = rot[np.argmin(delta)]
+
+            prev = b["twin"][p]
+            old.add(b["face"][prev])
+            b["nxt"][b["twin"][new]] = b["nxt"][prev]
+            b["nxt"][prev] = new
+
+        self._na += 2
+        self._views()
+        self._relabel(starts, old)
+
+    def remove_edge(self, v1, v2):
+        """Remove the edge (v1, v2) and update the faces it touches.
+
+        The edge is taken out of the rotation systems of v1 and v2, and
+        only the one or two faces it separates or splits are retraced.
+        """
+        self._dynamic()
+        a1 = self._arc(v1, v2)
+        if a1 < 0:
+            raise ValueError("edge ({}, {}) does not exist".format(v1, v2))
+
+        b = self._buf
+        a2 = b["twin"][a1]
+        old, starts = {b["face"][a1], b["face"][a2]}, []
+
+        for u, arc in ((v1, a1), (v2, a2)):
+            rot = self._rotation(u)
+            if len(rot) == 1:
+                self.out[u] = -1
+                continue
+
+            # Link the arcs on either side of the removed arc.
+            prev = b["twin"][rot[rot.index(arc) - 1]]
+            b["nxt"][prev] = b["nxt"][b["twin"][arc]]
+            if self.out[u] == arc:
+                self.out[u] = b["nxt"][prev]
+            starts.append(prev)
+
+        self._relabel(starts, old)
+        for a in sorted((a1, a2), reverse=True):
+            self._delete(a)
+
+    def geometry(self):
+        """Return the signed areas, centroids and perimeters of all faces.
+
+        Areas are found using the Shoelace formula, summed over the arcs of
+        all faces at once.  Bounded faces are traversed counter-clockwise
+        and have positive area, whereas the outer face of each connected
+        component is traversed clockwise and has negative area.
+        """
+        if self.gm:
+            return self.gm
+
+        arcs, offsets = self.facetable()
+        self.gm = self._geometry(arcs, offsets[:-1])
+        return self.gm
+
+    def _geometry(self, arcs, starts):
+        """Shoelace sums over the faces whose arcs start at the given offsets."""
+        src, dst, _, _ = self.he
+        x1, y1 = self.coords[src[arcs]].T
+        x2, y2 = self.coords[dst[arcs]].T
+
+        cross = x1*y2 - x2*y1
+        areas = 0.5 * np.add.reduceat(cross, starts)
+        perimeters = np.add.reduceat(np.hypot(x2 - x1, y2 - y1), starts)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cx = np.add.reduceat((x1+x2) * cross, starts) / (6*areas)
+            cy = np.add.reduceat((y1+y2) * cross, starts) / (6*areas)
+
+        return areas, np.column_stack([cx, cy]), perimeters
+
+    def outer(self):
+        """Return a boolean mask of the outer faces (one per component)."""
+        areas, _, _ = self.geometry()
+        return areas < 0
 
     def border(self):
         """Find border edges of the graph."""
-        # The border is the face with the largest area.
-        fs = self.faces()
-        ix = np.argmax([self._area(f) for f in fs])
+        if self.br:
+            return self.br
+
+        # The border is the clockwise face with the largest area.
+        areas, _, _ = self.geometry()
+        ix = np.argmin(areas)
+
+        if self._buf is None:
+            self.br = self.faces()[ix]
+        else:
+            # After incremental updates, walk around the face instead of
+            # rebuilding the whole face table.
+            src, dst, _, nxt = self.he
+            c, a = [self._buf["root"][ix]], nxt[self._buf["root"][ix]]
+            while a != c[0]:
+                c.append(a)
+                a = nxt[a]
+            self.br = list(zip(src[c].tolist(), dst[c].tolist()))
 
-        return fs[ix]
+        return self.br
 
 def plotgraph(coords, edges):
     """Plot the graph with given xy coordinates and edges."""
@@ -112,32 +585,35 @@ def plotgraph(coords, edges):
 
     plt.show()
 
-# Test coords and edges.
-coords = np.asarray([
-    [0, 1],
-    [1, 0],
-    [-0.5, -1],
-    [-1, 0],
-    [0, 0.25],
-    [0.7, -1.5],
-    [0.5, -1.0],
-    [0.9, -0.5] 
-])
-
-edges = np.asarray([
-    [0, 1],
-    [1, 2],
-    [2, 3],
-    [3, 0],
-    [4, 0],
-    [4, 3],
-    [4, 1],
-    [2, 5],
-    [5, 6],
-    [6, 7],
-    [7, 1]
-], dtype=int)
-
-g = Graph(coords, edges)
-print(g.faces())
-plotgraph(coords, edges)
+# The worker processes of Graph._trace() import this file, so the demo
+# must only run in the main process.
+if __name__ == "__main__":
+    # Test coords and edges.
+    coords = np.asarray([
+        [0, 1],
+        [1, 0],
+        [-0.5, -1],
+        [-1, 0],
+        [0, 0.25],
+        [0.7, -1.5],
+        [0.5, -1.0],
+        [0.9, -0.5] 
+    ])
+
+    edges = np.asarray([
+        [0, 1],
+        [1, 2],
+        [2, 3],
+        [3, 0],
+        [4, 0],
+        [4, 3],
+        [4, 1],
+        [2, 5],
+        [5, 6],
+        [6, 7],
+        [7, 1]
+    ], dtype=int)
+
+    g = Graph(coords, edges)
+    print(g.faces())
+    plotgraph(coords, edges)
@@ -10,9 +10,108 @@ y = np.pi * x + np.random.random(100)
 # Make the coefficient matrix; note the transpose.
 A = np.vstack([x, np.ones(len(x))]).T
 
-m, c = np.linalg.lstsq(A, y)[0]
+m, c = np.linalg.lstsq(A, y, rcond=None)[0]
+
+# For data that does not fit in memory, fit the line on the fly instead,
+# keeping only the means and the centered sums of squares and products.
+# Merging the sums of chunks (as in Chan et al.'s parallel variance
+# algorithm) avoids the cancellation of the raw normal equations.
+class LineFit:
+    """Streaming least-squares fit of y = m*x + c."""
+    def __init__(self):
+        self.n, self.mx, self.my = 0, 0., 0.
+        self.sxx, self.sxy, self.syy = 0., 0., 0.
+
+    def update(self, x, y):
+        """Add a chunk of data points to the fit."""
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        nb = len(x)
+        if nb == 0:
+            return self
+
+        mx, my = x.mean(), y.mean()
+        dx, dy = x - mx, y - my
+        sxx, sxy, syy = dx @ dx, dx @ dy, dy @ dy
+
+        n = self.n + nb
+        ex, ey = mx - self.mx, my - self.my
+        f = self.n * nb / n
+        self.sxx += sxx + f * ex * ex
+        self.sxy += sxy + f * ex * ey
+        self.syy += syy + f * ey * ey
+        self.mx += ex * nb / n
+        self.my += ey * nb / n
+        self.n = n
+
+        return self
+
+    def fit(self, chunks):
+        """Add chunks of (x, y) from an iterable to the fit."""
+        for x, y in chunks:
+            self.update(x, y)
+
+        return self
+
+    @property
+    def slope(self):
+        return self.sxy / self.sxx
+
+    @property
+    def intercept(self):
+        return self.my - self.slope * self.mx
+
+    @property
+    def residual(self):
+        """Sum of squared residuals."""
+        return self.syy - self.sxy**2 / self.sxx
+
+    @property
+    def covariance(self):
+        """Covariance matrix of (slope, intercept)."""
+        s2 = self.residual / (self.n - 2)
+        return s2 / self.sxx * np.array([[1, -self.mx],
+                                         [-self.mx, self.sxx / self.n + self.mx**2]])
+
+def chunks(x, y, size=2**20):
+    """Yield (x, y) in chunks, e.g., from memory-mapped arrays."""
+    for i in range(0, len(x), size):
+        yield x[i:i + size], y[i:i + size]
+
+def fitlines(x, y, mask=None):
+    """Fit lines to many series at once.
+
+    The series are the rows of the 2-D arrays x and y (x may also be a
+    single row shared by all series).  Ragged series are padded and
+    masked, mask being True for the points to use.  The 2x2 normal
+    equations of all series are solved in closed form, from the centered
+    sums as in LineFit.  Returns arrays of slopes, intercepts and sums of
+    squared residuals.
+    """
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+    if mask is None:
+        w = np.ones(y.shape)
+    else:
+        # The padding may hold anything (e.g., NaNs), so zero it out.
+        w = np.broadcast_to(mask, y.shape).astype(float)
+        x, y = np.where(w > 0, x, 0.), np.where(w > 0, y, 0.)
+
+    n = w.sum(axis=-1)
+    mx = (w * x).sum(axis=-1) / n
+    my = (w * y).sum(axis=-1) / n
+    dx, dy = w * (x - mx[..., None]), y - my[..., None]
+
+    sxx = (dx * (x - mx[..., None])).sum(axis=-1)
+    sxy = (dx * dy).sum(axis=-1)
+    syy = (w * dy * dy).sum(axis=-1)
+
+    slope = sxy / sxx
+    return slope, my - slope * mx, syy - sxy * slope
+
+f = LineFit().fit(chunks(x, y, 30))
 
 plt.plot(x, y, '.')
-plt.plot(x, m*x + c)
+plt.plot(x, m*x + c, label="lstsq")
+plt.plot(x, f.slope*x + f.intercept, '--', label="streaming")
+plt.legend()
 
 plt.show()
@@ -18,6 +18,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 import dedalus.public as d3
 from scipy.integrate import trapezoid
+from evp import solve_lowest
 
 # Parameters
 L = np.pi    # interval length
@@ -54,9 +55,10 @@ problem.add_equation("f(x=0) = 0")
 problem.add_equation("f(x=L) = 0")
 
 # Solve
+# The spectrum is symmetric about 0, which is itself an eigenvalue, so
+# start slightly off 0 and look on both sides.
 solver = problem.build_solver()
-solver.solve_dense(solver.subproblems[0])
-evals = solver.eigenvalues.real
+evals = solve_lowest(solver, 5, start=0.1, both=True).real
 
 # Plotting; sort according to absolute value since we have both
 # negative/positive eigenvalues of same magnitude.
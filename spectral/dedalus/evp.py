@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""Targeted sparse eigen-solves for Dedalus EVPs.
+
+A dense solve finds the whole spectrum at O(N^3) cost, even though only a
+few of the eigenvalues (the lowest ones, usually) are ever used.  The
+helper here instead calls solve_sparse() repeatedly, each time finding the
+eigenvalues nearest to a shift target, and walks the target along the real
+axis until the k lowest eigenvalues above the starting point (or the k
+eigenvalues nearest to it, walking both ways) are known.
+
+Each sparse solve at a target t finds all the eigenvalues in a disc around
+t, so the part of the real axis known to be covered only grows if the next
+target is placed (just inside) the edge of the covered part.  The spectrum
+is assumed to lie close to the real axis.
+
+Building a solver (creating the bases and fields, parsing the equations,
+and building the matrices) is itself expensive, so built problems are
+cached by build_evp(); scalar parameters are kept as fields so that they
+can be changed without building the problem again.
+"""
+
+import functools
+import logging
+
+import numpy as np
+import dedalus.public as d3
+
+logger = logging.getLogger(__name__)
+
+
+def solve_lowest(solver, k, start=0., both=False, nev=None, tol=1e-6, maxiter=100,
+                 rebuild_matrices=False):
+    """Find the k lowest eigenvalues above start using sparse solves.
+
+    Eigenvalues with real parts below start are ignored, unless both is
+    True, in which case the k eigenvalues nearest to start on either side
+    are found instead.
+
+    Parameters
+    ----------
+    solver : EigenvalueSolver
+        Dedalus solver of an EVP with a single subproblem
+    k : int
+        number of eigenvalues
+    start : float
+        starting target, which should not itself be an eigenvalue
+    both : bool
+        whether to walk the target to both sides of start (e.g., for
+        spectra symmetric about start), instead of only to the right
+    nev : int
+        number of eigenvalues per sparse solve (default: 2*k)
+    tol : float
+        relative tolerance for two eigenvalues found by different solves
+        to be the same (the accuracy of the sparse solves)
+    maxiter : int
+        maximum number of sparse solves
+    rebuild_matrices : bool
+        whether to rebuild the matrices (e.g., after changing parameters)
+
+    Returns the eigenvalues, sorted by the distance from start.  The
+    eigenvalues and eigenvectors of the solver are replaced by the ones
+    found, in the same order, so that solver.set_state(i, ...) works as
+    after a dense solve.
+    """
+    sp = solver.subproblems[0]
+    nev = nev or 2*k
+
+    evals, evecs = np.empty(0, dtype=complex), []
+    lo, hi = start, start
+    target = start
+    for _ in range(maxiter):
+        solver.solve_sparse(sp, nev, target, rebuild_matrices=rebuild_matrices)
+        rebuild_matrices = False
+
+        # Keep the physical (finite) eigenvalues that are not known yet.
+        found = np.isfinite(solver.eigenvalues)
+        new = solver.eigenvalues[found]
+        vecs = solver.eigenvectors[:, found]
+        if len(evals):
+            # Eigenvalues found again agree with the known ones to within
+            # the accuracy of the solves.  Multiple eigenvalues are kept as
+            # often as they occur in any one solve, so the i-th copy of an
+            # eigenvalue in this solve is new only if fewer than i copies
+            # are known.
+            thr = tol * np.maximum(np.abs(new), 1)[:, None]
+            known_copies = (np.abs(new[:, None] - evals) <= thr).sum(axis=1)
+            copy = np.tril(np.abs(new[:, None] - new) <= thr).sum(axis=1)
+            fresh = copy > known_copies
+            new, vecs = new[fresh], vecs[:, fresh]
+
+        evals = np.concatenate([evals, new])
+        evecs.append(vecs)
+
+        # The disc around the target up to the farthest eigenvalue found
+        # has been searched completely.
+        r = np.abs(solver.eigenvalues[found] - target).max(initial=0)
+        lo, hi = min(lo, target - r), max(hi, target + r)
+
+        # Only the eigenvalues in the covered part [lo, hi] are certain.
+        if both:
+            radius = min(hi - start, start - lo)
+            known = np.abs(evals - start) <= radius
+        else:
+            known = (evals.real >= start) & (evals.real <= hi)
+        if np.sum(known) >= k:
+            break
+
+        # The edges of the covered part are eigenvalues themselves, so the
+        # next target is moved slightly inwards to avoid a singular shift.
+        if both and (start - lo < hi - start):
+            target = lo + r/nev
+        else:
+            target = hi - r/nev
+    else:
+        logger.warning("Found only %d of %d eigenvalues after %d sparse solves.",
+                       np.sum(known), k, maxiter)
+
+    order = np.flatnonzero(known)
+    order = order[np.argsort(np.abs(evals[order] - start), kind="stable")[:k]]
+    solver.eigenvalues = evals[order]
+    solver.eigenvectors = np.column_stack(evecs)[:, order]
+
+    return solver.eigenvalues
+
+
+class Eigenvectors:
+    """Grid values of the eigenvectors of a solver, computed on demand.
+
+    Indexing with an integer transforms that one eigenvector to grid space
+    (using solver.set_state()), whereas indexing with a slice or an array
+    of indices returns another lazy view.  Converting the view to an array
+    transforms all the eigenvectors in it.
+
+    Parameters
+    ----------
+    solver : EigenvalueSolver
+        Dedalus solver after an eigen-solve
+    field : int
+        index of the state field to take the values of
+    indices : array of int
+        indices of the eigenvectors in the view (default: all)
+    """
+    def __init__(self, solver, field=0, indices=None):
+        self.solver = solver
+        self.field = field
+        self.vectors = solver.eigenvectors
+        if indices is None:
+            indices = np.arange(len(solver.eigenvalues))
+        self.indices = np.asarray(indices)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, (int, np.integer)):
+            # The solver may have been reused for another solve since (see
+            # build_evp()), so put back the eigenvectors of this view.
+            solver = self.solver
+            current, solver.eigenvectors = solver.eigenvectors, self.vectors
+            try:
+                solver.set_state(self.indices[i], solver.subsystems[0])
+            finally:
+                solver.eigenvectors = current
+            return np.copy(solver.state[self.field]["g"])
+
+        view = Eigenvectors(self.solver, self.field, self.indices[i])
+        view.vectors = self.vectors
+        return view
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array([self[i] for i in range(len(self))], dtype=dtype)
+
+
+class EVP:
+    """A built Dedalus EVP on a Chebyshev basis with adjustable parameters.
+
+    Every variable f gets as many tau fields tau_f1, tau_f2, ... as the
+    order of the problem, and the equations may use the derivatives f1,
+    f2, ... (lifted as in the first-order formulation), the eigenvalue,
+    the parameters and L (the right end of the interval).
+
+    Parameters
+    ----------
+    N : int
+        number of collocation points
+    bounds : tuple
+        interval
+    dtype : type
+        data type of the fields
+    variables : tuple of str
+        names of the unknown fields
+    eigenvalue : str
+        name of the eigenvalue
+    equations : tuple of str
+        equations and boundary conditions
+    order : int
+        order of the problem
+    params : tuple of str
+        names of scalar parameters used in the equations
+    """
+    def __init__(self, N, bounds, dtype, variables, eigenvalue, equations, order=2, params=()):
+        # Bases
+        self.coord = d3.Coordinate("x")
+        self.dist = d3.Distributor(self.coord, dtype=dtype)
+        self.basis = d3.Chebyshev(self.coord, size=N, bounds=bounds)
+        self.x = self.dist.local_grid(self.basis)
+
+        # Substitutions
+        D = lambda f: d3.Differentiate(f, self.coord)
+        lift_basis = self.basis.derivative_basis(1)
+        lift = lambda f: d3.Lift(f, lift_basis, -1)
+
+        # Fields, tau fields and derivatives
+        ns = dict(D=D, lift=lift, L=bounds[1])
+        fields, taus = [], []
+        for name in variables:
+            f = ns[name] = self.dist.Field(name=name, bases=self.basis)
+            fields.append(f)
+            for i in range(1, order + 1):
+                tau = ns["tau_{}{}".format(name, i)] = self.dist.Field(name="tau_{}{}".format(name, i))
+                taus.append(tau)
+                f = ns["{}{}".format(name, i)] = D(f) + lift(tau)
+
+        # Parameters are constant fields, set to 1 until they are given.
+        self.params = dict()
+        for name in params:
+            p = ns[name] = self.dist.Field(name=name)
+            p["g"] = 1
+            self.params[name] = p
+        ns[eigenvalue] = self.dist.Field(name=eigenvalue)
+
+        # Problem
+        problem = d3.EVP(fields + taus, eigenvalue=ns[eigenvalue], namespace=ns)
+        for eq in equations:
+            problem.add_equation(eq)
+
+        self.solver = problem.build_solver()
+        self.values = dict.fromkeys(params, 1)
+        self.rebuild = False
+
+    def set(self, **values):
+        """Set parameters; the matrices are rebuilt on the next solve if needed."""
+        for name, value in values.items():
+            if self.values[name] != value:
+                self.params[name]["g"] = value
+                self.values[name] = value
+                self.rebuild = True
+
+    def solve(self, k=None, **kw):
+        """Solve densely, or for the lowest k eigenvalues with solve_lowest()."""
+        rebuild, self.rebuild = self.rebuild, False
+        if k is None:
+            self.solver.solve_dense(self.solver.subproblems[0], rebuild_matrices=rebuild)
+        else:
+            solve_lowest(self.solver, k, rebuild_matrices=rebuild, **kw)
+
+        return self.solver.eigenvalues
+
+
+@functools.lru_cache(maxsize=8)
+def build_evp(N, bounds, dtype, variables, eigenvalue, equations, order=2, params=()):
+    """Return a (cached) built EVP.
+
+    The arguments are those of EVP and have to be hashable (tuples instead
+    of lists).  Only the 8 most recently used problems are kept.
+    """
+    return EVP(N, bounds, dtype, variables, eigenvalue, equations, order, params)
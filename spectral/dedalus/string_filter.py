@@ -7,11 +7,40 @@ pi] and described by the standard equation:
     d^2f/dx^2 + omega^2 * f = 0
 
 The eigenvalues are 1, 2, 3, ...
+
+The higher resolutions used for cleaning are solved in worker processes.
+These are started with the "spawn" method, as forking a process in which
+Dedalus has already initialized MPI is unsafe.  For the same reason, the
+script should not be run under mpirun with more than one process.
 """
 
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import matplotlib.pyplot as plt
-import dedalus.public as d3
+from evp import Eigenvectors, build_evp
+from scipy.spatial import cKDTree
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for the cleaning resolutions.  The pool is kept between
+# calls to StringModes.solve(), so that the problems cached by build_evp()
+# in the workers are reused (e.g., in a loop over eps).
+_pool, _pool_size = None, 0
+
+def _executor(workers):
+    """Return the shared pool of worker processes, (re)starting it if needed."""
+    global _pool, _pool_size
+    if _pool is None or _pool_size != workers:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = ProcessPoolExecutor(max_workers=workers,
+                                    mp_context=multiprocessing.get_context("spawn"))
+        _pool_size = workers
+
+    return _pool
 
 class StringModes:
     """
@@ -29,64 +58,81 @@ class StringModes:
         self.eps = eps
         self.N = 128
 
-    def solve_evp_N(self, N):
-        eps, L = self.eps, self.L
-        # Bases
-        coord = d3.Coordinate("x")
-        dist = d3.Distributor(coord, dtype=np.float64)
-        basis = d3.Chebyshev(coord, size=N, bounds=(0, L))
-
-        # Fields
-        f = dist.Field(name="f", bases=basis)
-        omega2 = dist.Field(name="omega2")
-
-        # Substitutions
-        D = lambda f: d3.Differentiate(f, coord)
-        lift_basis = basis.derivative_basis(1)
-        lift = lambda f: d3.Lift(f, lift_basis, -1)
-
-        # Tau fields
-        tau_f1 = dist.Field(name="tau_f1")
-        f1 = D(f) + lift(tau_f1)
-        tau_f2 = dist.Field(name="tau_f2")
-        f2 = D(f1) + lift(tau_f2)
-
-        # Problem
-        problem = d3.EVP([f, tau_f1, tau_f2], eigenvalue=omega2, namespace=locals())
-        problem.add_equation("eps**2*f2 + omega2*f = 0")
-
-        # Boundary conditions
-        problem.add_equation("f(x=0) = 0")
-        problem.add_equation("f(x=L) = 0")
-
-        # Solve
-        solver = problem.build_solver()
-        solver.solve_dense(solver.subproblems[0])
-
-        evals = solver.eigenvalues
-        evecs = []
+    def solve_evp_N(self, N, vectors=True, k=None):
+        # The problem is built once for every resolution and reused when
+        # only eps changes.
+        evp = build_evp(N, (0, self.L), np.float64, ("f",), "omega2",
+                        ("eps**2*f2 + omega2*f = 0", "f(x=0) = 0", "f(x=L) = 0"),
+                        params=("eps",))
+        evp.set(eps=self.eps)
+        evals = evp.solve(k)
+
+        if not vectors:
+            return evp.x, evals, None
+
+        # The eigenvectors are only transformed to grid space when used.
+        return evp.x, evals, Eigenvectors(evp.solver)
+
+    def solve(self, clean=True, clean_factor=1.5, workers=None, k=None):
+        """Solve for the eigenmodes.
+
+        If clean is True, the eigenvalues are compared with those obtained
+        at clean_factor times the resolution, and only the ones that agree
+        are kept.  clean_factor may also be a sequence of factors, in which
+        case the eigenvalues have to agree at every resolution.  The higher
+        resolutions are solved (for eigenvalues only) by workers (one per
+        factor by default) while the base resolution is solved in this
+        process; with workers=0, all resolutions are solved in this
+        process one after the other.  Either way, built problems are
+        cached, so that repeated calls (e.g., for other eps) reuse them.
+
+        If k is given, only the lowest k eigenvalues are found at every
+        resolution, using sparse solves instead of dense ones.
+        """
+        if not clean:
+            x, evals_low, evecs_low = self.solve_evp_N(self.N, k=k)
+            indx = np.argsort(evals_low.real)
+            evals = evals_low[indx]
+            return x, np.sqrt(evals.real), evecs_low[indx]
 
-        for i in range(len(evals)):
-            solver.set_state(i, solver.subsystems[0])
-            fg = np.copy(solver.state[0]["g"])
-            evecs.append(fg)
+        factors = np.atleast_1d(clean_factor)
+        if workers == 0:
+            x, evals_low, evecs_low = self.solve_evp_N(self.N, k=k)
+            evals_hi = [_solve_evals(self.L, self.eps, int(c*self.N), k) for c in factors]
+        else:
+            pool = _executor(workers or len(factors))
+            futures = [pool.submit(_solve_evals, self.L, self.eps, int(c*self.N), k) for c in factors]
+            x, evals_low, evecs_low = self.solve_evp_N(self.N, k=k)
+            evals_hi = [f.result() for f in futures]
+
+        indx = None
+        for e in evals_hi:
+            cleaner = FilterEigenvalues(evals_low, e)
+            _, i = cleaner.clean()
+            indx = i if indx is None else indx[np.isin(indx, i)]
+        evals = evals_low[indx]
 
-        x = dist.local_grid(basis)
-        return x, evals, np.array(evecs)
+        return x, np.sqrt(evals.real), evecs_low[indx]
 
-    def solve(self, clean=True, clean_factor=1.5):
-        x, evals_low, evecs_low = self.solve_evp_N(self.N)
+def _solve_evals(L, eps, N, k=None):
+    """Return the eigenvalues of a string at resolution N (in a worker)."""
+    s = StringModes(L, eps, N)
+    return s.solve_evp_N(N, vectors=False, k=k)[1]
 
-        if clean:
-            _, evals_hi, evecs_hi = self.solve_evp_N(int(clean_factor*self.N))
+def nearest(a, b):
+    """Distance from each element of a to the nearest element of b.
 
-            cleaner = FilterEigenvalues(evals_low, evals_hi)
-            evals, indx = cleaner.clean()
-        else:
-            indx = np.argsort(evals_low.real)
-            evals = evals_low[indx]
+    The array b must be sorted by real part.  Real values are looked up by
+    binary search, and complex values using a KD-tree in the complex plane.
+    """
+    if np.iscomplexobj(a) and a.imag.any() or np.iscomplexobj(b) and b.imag.any():
+        tree = cKDTree(np.column_stack([b.real, b.imag]))
+        return tree.query(np.column_stack([a.real, a.imag]))[0]
 
-        return x, np.sqrt(evals.real), evecs_low[indx]
+    a, b = a.real, b.real
+    j = np.searchsorted(b, a)
+    left, right = b[np.maximum(j - 1, 0)], b[np.minimum(j, len(b) - 1)]
+    return np.minimum(np.abs(a - left), np.abs(a - right))
 
 class FilterEigenvalues:
     """Adapted from eigentools.py from Dedalus v2 [1].
@@ -115,59 +161,42 @@ class FilterEigenvalues:
         evals_low = self.evals_low
         evals_hi = self.evals_hi
 
-        # Reverse engineer correct indices to make unsorted list from sorted.
-        reverse_evals_low_indx = np.arange(len(evals_low))
-        reverse_evals_hi_indx = np.arange(len(evals_hi))
-
-        evals_low_and_indx = np.asarray(list(zip(evals_low, reverse_evals_low_indx)))
-        evals_hi_and_indx = np.asarray(list(zip(evals_hi, reverse_evals_hi_indx)))
-
-        # Remove NaNs
-        evals_low_and_indx = evals_low_and_indx[np.isfinite(evals_low)]
-        evals_hi_and_indx = evals_hi_and_indx[np.isfinite(evals_hi)]
-
-        # Sort evals_low and evals_hi by real parts.
-        evals_low_and_indx = evals_low_and_indx[np.argsort(evals_low_and_indx[:, 0].real)]
-        evals_hi_and_indx = evals_hi_and_indx[np.argsort(evals_hi_and_indx[:, 0].real)]
+        # Remove NaNs and sort by real parts, keeping the original indices
+        # of the eigenvalues in a separate array.
+        indx_low = np.flatnonzero(np.isfinite(evals_low))
+        indx_low = indx_low[np.argsort(evals_low[indx_low].real, kind="stable")]
+        indx_hi = np.flatnonzero(np.isfinite(evals_hi))
+        indx_hi = indx_hi[np.argsort(evals_hi[indx_hi].real, kind="stable")]
 
-        evals_low_sorted = evals_low_and_indx[:, 0]
-        evals_hi_sorted = evals_hi_and_indx[:, 0]
+        evals_low_sorted = evals_low[indx_low]
+        evals_hi_sorted = evals_hi[indx_hi]
 
         # Compute sigmas from lower resolution run.
-        sigmas = np.zeros(len(evals_low_sorted))
-        sigmas[0] = np.abs(evals_low_sorted[0] - evals_low_sorted[1])
-        sigmas[1:-1] = [
-            0.5 * (np.abs(evals_low_sorted[j] - evals_low_sorted[j - 1]) +
-                   np.abs(evals_low_sorted[j + 1] - evals_low_sorted[j]))
-            for j in range(1, len(evals_low_sorted) - 1)
-        ]
-        sigmas[-1] = np.abs(evals_low_sorted[-2] - evals_low_sorted[-1])
+        gaps = np.abs(np.diff(evals_low_sorted))
+        sigmas = np.empty(len(evals_low_sorted))
+        sigmas[0], sigmas[-1] = gaps[0], gaps[-1]
+        sigmas[1:-1] = 0.5 * (gaps[:-1] + gaps[1:])
 
         if not (np.isfinite(sigmas)).all():
             logger.warning(
                 "At least one eigenvalue spacings (sigmas) is non-finite (np.inf or np.nan)!")
 
-        # Ordinal delta.
-        self.delta_ordinal = np.array([
-            np.abs(evals_low_sorted[j] - evals_hi_sorted[j]) / sigmas[j]
-            for j in range(len(evals_low_sorted))
-        ])
-
-        # Nearest delta.
-        self.delta_near = np.array([
-            np.nanmin(np.abs(evals_low_sorted[j] - evals_hi_sorted) / sigmas[j])
-            for j in range(len(evals_low_sorted))
-        ])
-
-        # Discard eigenvalues with 1/delta_near < drift_threshold.
-        if use_ordinal:
-            inverse_drift = 1 / self.delta_ordinal
-        else:
-            inverse_drift = 1 / self.delta_near
-        evals_low_and_indx = evals_low_and_indx[np.where(inverse_drift > self.drift_threshold)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Ordinal delta.
+            n = len(evals_low_sorted)
+            self.delta_ordinal = np.abs(evals_low_sorted - evals_hi_sorted[:n]) / sigmas
+
+            # Nearest delta.
+            self.delta_near = nearest(evals_low_sorted, evals_hi_sorted) / sigmas
+
+            # Discard eigenvalues with 1/delta_near < drift_threshold.
+            if use_ordinal:
+                inverse_drift = 1 / self.delta_ordinal
+            else:
+                inverse_drift = 1 / self.delta_near
 
-        evals_low = evals_low_and_indx[:, 0]
-        indx = evals_low_and_indx[:, 1].real.astype(np.int32)
+        indx = indx_low[inverse_drift > self.drift_threshold].astype(np.int32)
+        evals_low = evals_low[indx]
 
         self.cleaned = True
         return evals_low, indx
@@ -208,14 +237,17 @@ class FilterEigenvalues:
 
         return ax
 
-s = StringModes()
-x, evals, evecs = s.solve()
-print(len(evals))
+# The worker processes import this file, so the script itself must only
+# run in the main process.
+if __name__ == "__main__":
+    s = StringModes()
+    x, evals, evecs = s.solve()
+    print(len(evals))
 
-for i in range(5):
-    plt.plot(x, evecs[i])
+    for i in range(5):
+        plt.plot(x, evecs[i])
 
-plt.title(r"first 5 eigenmodes of a vibrating string")
-plt.ylabel(r"displacement $f(x)$")
-plt.xlabel(r"coordinate $x$")
-plt.show()
+    plt.title(r"first 5 eigenmodes of a vibrating string")
+    plt.ylabel(r"displacement $f(x)$")
+    plt.xlabel(r"coordinate $x$")
+    plt.show()
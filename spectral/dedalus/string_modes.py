@@ -12,6 +12,7 @@ The eigenvalues are 1, 2, 3, ...
 import numpy as np
 import matplotlib.pyplot as plt
 import dedalus.public as d3
+from evp import solve_lowest
 
 # Parameters
 L = np.pi # interval length
@@ -47,8 +48,7 @@ problem.add_equation("f(x=L) = 0")
 
 # Solve
 solver = problem.build_solver()
-solver.solve_dense(solver.subproblems[0])
-evals = np.sqrt(solver.eigenvalues.real)
+evals = np.sqrt(solve_lowest(solver, 5).real)
 
 # Plot
 x = dist.local_grid(basis)
@@ -3,6 +3,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import dedalus.public as d3
+from evp import solve_lowest
 
 # Parameters
 L = np.pi    # interval length
@@ -47,7 +48,6 @@ problem.add_equation("g(x=L) = 0")
 
 # Solve
 solver = problem.build_solver()
-solver.solve_dense(solver.subproblems[0])
-evals = np.sqrt(np.sort(solver.eigenvalues).real)
+evals = np.sqrt(np.sort(solve_lowest(solver, 16)).real)
 
 print(evals[:16])